@@ -2,13 +2,18 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 
-# Import the Base object from your models to autogenerate migrations
-from models.users import Base  # Import your models' Base
+from config.config import settings
+# Import the Base object and every model so autogenerate sees all tables
+from database.db import Base
+from models import holdings, idempotency, order, outbox, price_history, stock, stock_stats, transaction, users  # noqa: F401
 
 # this is the Alembic Config object, which provides access to the values
 # within the .ini file in use.
 config = context.config
 
+# Use the same (environment-driven) database URL as the application.
+config.set_main_option("sqlalchemy.url", settings.SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
+
 # Interpret the config file for Python logging. This line sets up loggers.
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
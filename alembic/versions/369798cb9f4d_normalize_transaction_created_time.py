@@ -0,0 +1,30 @@
+"""Normalize transaction created_time
+
+Revision ID: 369798cb9f4d
+Revises: 4deadd52fdc4
+Create Date: 2026-10-18 16:30:02.417978
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '369798cb9f4d'
+down_revision: Union[str, None] = '4deadd52fdc4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        # Rows stamped by SQLite's CURRENT_TIMESTAMP lack the microseconds SQLAlchemy binds,
+        # so as text they compare wrongly against keyset cursors and time-range bounds.
+        op.execute("UPDATE transactions SET created_time = created_time || '.000000' "
+                   "WHERE length(created_time) = 19")
+
+
+def downgrade() -> None:
+    # The normalised form is what SQLAlchemy writes itself; nothing to undo.
+    pass
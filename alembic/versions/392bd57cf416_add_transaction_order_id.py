@@ -0,0 +1,31 @@
+"""Add transaction order id
+
+Revision ID: 392bd57cf416
+Revises: 369798cb9f4d
+Create Date: 2026-10-18 16:41:27.048787
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '392bd57cf416'
+down_revision: Union[str, None] = '369798cb9f4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # batch mode so SQLite, which cannot add a foreign key in place, rebuilds the table
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.add_column(sa.Column('order_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_transactions_order_id_orders', 'orders', ['order_id'], ['id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_constraint('fk_transactions_order_id_orders', type_='foreignkey')
+        batch_op.drop_column('order_id')
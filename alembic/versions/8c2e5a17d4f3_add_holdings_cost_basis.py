@@ -0,0 +1,38 @@
+"""Add holdings cost basis
+
+Revision ID: 8c2e5a17d4f3
+Revises: 392bd57cf416
+Create Date: 2026-10-18 17:05:12.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e5a17d4f3'
+down_revision: Union[str, None] = '392bd57cf416'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('holdings', sa.Column('cost_basis', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('holdings', sa.Column('realized_pnl', sa.Float(), nullable=False, server_default='0'))
+    # Seed both from the old all-buys average; `python -m scripts.rebuild_portfolios`
+    # replays the history for the exact per-sale figures.
+    op.execute(
+        "UPDATE holdings SET "
+        "cost_basis = CASE WHEN bought_volume > 0 "
+        "THEN (bought_volume - sold_volume) * bought_cost / bought_volume ELSE 0 END, "
+        "realized_pnl = sold_proceeds - CASE WHEN bought_volume > 0 "
+        "THEN sold_volume * bought_cost / bought_volume ELSE 0 END"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('holdings') as batch_op:
+        batch_op.drop_column('realized_pnl')
+        batch_op.drop_column('cost_basis')
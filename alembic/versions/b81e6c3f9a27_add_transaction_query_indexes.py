@@ -0,0 +1,36 @@
+"""Add transaction query indexes
+
+Revision ID: b81e6c3f9a27
+Revises: 7d4b2f8e1c63
+Create Date: 2026-10-18 10:16:32.904457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81e6c3f9a27'
+down_revision: Union[str, None] = '7d4b2f8e1c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transactions_user_id_created_time', 'transactions', ['user_id', 'created_time'], unique=False)
+    op.create_index('ix_transactions_ticker_id_created_time', 'transactions', ['ticker_id', 'created_time'], unique=False)
+    op.create_index('ix_transactions_created_time_id', 'transactions', ['created_time', 'id'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # transactions is append-only, so created_time follows the physical order and a
+        # BRIN index serves time-range scans (exports, reconciliation) at a tiny size.
+        op.create_index('ix_transactions_created_time_brin', 'transactions', ['created_time'],
+                        unique=False, postgresql_using='brin')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_transactions_created_time_brin', table_name='transactions')
+    op.drop_index('ix_transactions_created_time_id', table_name='transactions')
+    op.drop_index('ix_transactions_ticker_id_created_time', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_created_time', table_name='transactions')
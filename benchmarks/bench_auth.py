@@ -0,0 +1,75 @@
+"""
+Per-request authentication overhead: a full HS256 decode and verify on every call
+against the verified-token cache, and the cost of a protected request end to end.
+
+    python -m benchmarks.bench_auth --iterations 100000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+
+def per_call(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def per_request(client, path: str, headers, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await client.get(path, headers=headers)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    import httpx
+    from fastapi import Depends, FastAPI
+    from jose import jwt
+    from common.authentication import (ALGORITHM, SECRET_KEY, create_access_token, get_current_user,
+                                       token_cache, verify_token)
+
+    token = create_access_token({"sub": "user1", "uid": 1})
+
+    def uncached():
+        token_cache.clear()
+        verify_token(token)
+
+    decode = per_call(lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), args.iterations)
+    cold = per_call(uncached, args.iterations)
+    warm = per_call(lambda: verify_token(token), args.iterations)
+    print(f"jwt.decode only      : {decode:8.2f} us/call")
+    print(f"verify_token (miss)  : {cold:8.2f} us/call")
+    print(f"verify_token (cached): {warm:8.2f} us/call ({cold / warm:.0f}x faster)")
+
+    app = FastAPI()
+
+    @app.get("/open")
+    async def open_route():
+        return {}
+
+    @app.get("/protected")
+    async def protected_route(user=Depends(get_current_user)):
+        return {}
+
+    async def drive():
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            base = await per_request(client, "/open", headers, args.requests)
+            protected = await per_request(client, "/protected", headers, args.requests)
+        print(f"request without auth : {base:8.2f} us")
+        print(f"request with auth    : {protected:8.2f} us (overhead {protected - base:.2f} us)")
+
+    asyncio.run(drive())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare submitting N orders one per request to POST /transactions against the same
+orders sent through POST /transactions/batch. Requests go through the ASGI app
+in-process, so the numbers reflect handler and DB cost rather than the network.
+
+    python -m benchmarks.bench_batch_orders --orders 10000 --batch-size 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+
+def make_orders(count: int, users: int, stocks: int):
+    return [{
+        "username": f"user{random.randint(1, users)}",
+        "ticker": f"T{random.randint(1, stocks)}",
+        "transaction_volume": random.randint(1, 10),
+        "transaction_type": "BUY",
+    } for _ in range(count)]
+
+
+async def run(orders, batch_size: int, concurrency: int):
+    import httpx
+    from common.authentication import create_access_token
+    from scripts.run import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user1', 'uid': 1})}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        queue = iter(orders)
+
+        async def worker():
+            for order in queue:
+                response = await client.post("/transactions", json=order)
+                assert response.status_code == 201, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        single = time.perf_counter() - started
+        print(f"single: {len(orders)} orders in {single:.2f}s ({len(orders) / single:,.0f} orders/s)")
+
+        started = time.perf_counter()
+        for offset in range(0, len(orders), batch_size):
+            response = await client.post("/transactions/batch", json=orders[offset:offset + batch_size])
+            assert response.status_code == 201, response.text
+        batch = time.perf_counter() - started
+        print(f" batch: {len(orders)} orders in {batch:.2f}s ({len(orders) / batch:,.0f} orders/s), "
+              f"{single / batch:.1f}x faster")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_batch')}")
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--stocks", type=int, default=200)
+    args = parser.parse_args()
+
+    from benchmarks.http_load import UNLIMITED_ENV
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.update(UNLIMITED_ENV)
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=args.users, stocks=args.stocks)
+    asyncio.run(run(make_orders(args.orders, args.users, args.stocks), args.batch_size, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
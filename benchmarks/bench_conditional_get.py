@@ -0,0 +1,89 @@
+"""
+Cost of dashboard polling of GET /stocks/ and GET /users/{username} per response mode:
+
+- uncached: RESPONSE_CACHE_TTL=0, every poll reads (stock cache or users table) and encodes
+- cached: bodies served from the response cache, full 200 responses
+- revalidated: clients send the ETag they got back in If-None-Match and receive 304
+
+Requests go through the whole ASGI app in-process. CPU time and SQL statements are
+reported per request. Afterwards a trade checks that the user's ETag changes at once.
+
+    python -m benchmarks.bench_conditional_get --stocks 2000 --polls 500
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+
+async def poll(client, path: str, polls: int, revalidate: bool, statements: list):
+    etag = (await client.get(path)).headers["etag"]
+    statements.clear()
+    started = time.process_time()
+    for _ in range(polls):
+        response = await client.get(path, headers={"If-None-Match": etag} if revalidate else None)
+        assert response.status_code == (304 if revalidate else 200), response.status_code
+    cpu = time.process_time() - started
+    return cpu / polls * 1000, len(statements) / polls
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import event
+
+    from common.authentication import create_access_token
+    from database.db import async_engine
+    from scripts.run import app
+    from services.response_cache import response_cache
+
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    paths = {"stocks": "/stocks/", "user": "/users/user1"}
+    ttl = response_cache.ttl
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'endpoint':<8} {'mode':<12} {'cpu ms/req':>10} {'sql/req':>8}")
+        for name, path in paths.items():
+            for mode in ("uncached", "cached", "revalidated"):
+                response_cache.ttl = 0 if mode == "uncached" else ttl
+                response_cache.clear()
+                cpu_ms, sql = await poll(client, path, args.polls, mode == "revalidated", statements)
+                print(f"{name:<8} {mode:<12} {cpu_ms:>10.3f} {sql:>8.2f}")
+
+        etag = (await client.get(paths["user"])).headers["etag"]
+        token = create_access_token({"sub": "user1", "uid": 1})
+        placed = await client.post("/transactions", headers={"Authorization": f"Bearer {token}"}, json={
+            "username": "user1", "ticker": "T1", "transaction_volume": 1, "transaction_type": "BUY"
+        })
+        after = await client.get(paths["user"], headers={"If-None-Match": etag})
+        print(f"after a trade: order {placed.status_code}, revalidation {after.status_code}, "
+              f"etag changed: {after.headers['etag'] != etag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_conditional_get')}")
+    parser.add_argument("--stocks", type=int, default=2000)
+    parser.add_argument("--polls", type=int, default=500)
+    args = parser.parse_args()
+
+    from benchmarks.http_load import UNLIMITED_ENV
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.update(UNLIMITED_ENV)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=10, stocks=args.stocks)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
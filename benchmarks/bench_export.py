@@ -0,0 +1,99 @@
+"""
+Throughput and peak memory of the transaction export:
+
+- cli_csv / cli_parquet: scripts.export_transactions writing a local file
+- http_csv / http_parquet: GET /transactions/export downloaded from a uvicorn worker
+- http_ndjson: GET /transactions/?stream=ndjson, the previous way to pull everything
+
+Each run is a fresh process, so its peak RSS is the memory the export needed on top
+of the interpreter. Running with a tenth of the rows shows whether that peak grows
+with the size of the export.
+
+    python -m benchmarks.bench_export --rows 10000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.seed import temp_sqlite_path
+
+
+def peak_rss_mb(pid: int) -> float:
+    """High-water mark of a live process' resident memory (Linux)."""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def run_cli(args, fmt: str):
+    output = f"bench_export.{fmt}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "scripts.export_transactions", output, "--format", fmt],
+                               env={**os.environ, "DATABASE_URL": args.database_url, "LOG_LEVEL": "WARNING"})
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if status != 0:
+        raise RuntimeError(f"export to {fmt} failed")
+    size = os.path.getsize(output)
+    os.remove(output)
+    return elapsed, size, usage.ru_maxrss / 1024
+
+
+def run_http(args, path: str):
+    from benchmarks.http_load import UvicornServer
+
+    with UvicornServer(args.database_url, port=args.port, stdout=subprocess.DEVNULL,
+                       env={"LOG_LEVEL": "WARNING"}) as server:
+        idle = peak_rss_mb(server.process.pid)
+        size = 0
+        started = time.perf_counter()
+        with httpx.stream("GET", server.base_url + path, timeout=None) as response:
+            response.raise_for_status()
+            for data in response.iter_raw():
+                size += len(data)
+        elapsed = time.perf_counter() - started
+        return elapsed, size, peak_rss_mb(server.process.pid) - idle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_export')}")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in the database")
+    parser.add_argument("--port", type=int, default=8773)
+    parser.add_argument("--only", nargs="*", help="Run only these modes")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    if not args.skip_seed:
+        from benchmarks.seed import seed
+        from database.db import engine
+
+        started = time.perf_counter()
+        seed(engine, users=1000, stocks=200, transactions=args.rows)
+        print(f"seeded {args.rows} transactions in {time.perf_counter() - started:.0f}s")
+
+    modes = {
+        "cli_csv": lambda: run_cli(args, "csv"),
+        "cli_parquet": lambda: run_cli(args, "parquet"),
+        "http_csv": lambda: run_http(args, "/transactions/export?format=csv"),
+        "http_parquet": lambda: run_http(args, "/transactions/export?format=parquet"),
+        "http_ndjson": lambda: run_http(args, "/transactions/?stream=ndjson"),
+    }
+    print(f"{'mode':<14} {'seconds':>8} {'rows/s':>10} {'MB':>8} {'peak RSS MB':>12}")
+    for name, run in modes.items():
+        if args.only and name not in args.only:
+            continue
+        elapsed, size, rss = run()
+        print(f"{name:<14} {elapsed:>8.1f} {args.rows / elapsed:>10.0f} {size / 2**20:>8.1f} {rss:>12.1f}")
+    print("peak RSS: whole process for cli_*, growth over the idle server for http_*")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+CPU cost of turning fetched transaction rows into a JSON body, per listing path:
+
+- model_per_row: the old get_transactions_by_username, a TransactionResponse built per
+  row and then validated again against list[TransactionResponse] and dumped
+- asdict_response_model: Row._asdict() dicts, as the listings built them before,
+  validated against the response model and dumped
+- response_model: row dicts validated once against the response model and dumped by
+  Pydantic, which is what FastAPI does with FAST_JSON_LISTINGS off
+- orjson: FastJSONResponse over the row dicts, FAST_JSON_LISTINGS on
+
+Rows come from an in-memory SQLite database and are fetched once; only encoding is timed.
+
+    python -m benchmarks.bench_json_listing --rows 100000
+"""
+import argparse
+import json
+import os
+import time
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        best = min(best, time.process_time() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite://"
+    from pydantic import TypeAdapter
+    from sqlalchemy.pool import StaticPool
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from benchmarks.seed import seed
+    from fastapi import Response
+
+    from config.config import settings
+    from routes.transaction_routes import listing_response, transaction_rows_query
+    from schemas.transaction_schema import TransactionResponse
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    seed(engine, users=10, stocks=50, transactions=args.rows)
+    with Session(engine) as db:
+        rows = db.execute(transaction_rows_query()).all()
+
+    adapter = TypeAdapter(list[TransactionResponse])
+
+    def model_per_row():
+        models = [TransactionResponse(
+            id=row.id, transaction_volume=row.transaction_volume, transaction_type=row.transaction_type,
+            transaction_price=row.transaction_price, created_time=row.created_time,
+            username=row.username, ticker=row.ticker
+        ) for row in rows]
+        return adapter.dump_json(adapter.validate_python(models, from_attributes=True))
+
+    def asdict_response_model():
+        return adapter.dump_json(adapter.validate_python([row._asdict() for row in rows]))
+
+    def response_model():
+        return adapter.dump_json(adapter.validate_python(listing_response(rows, Response())))
+
+    def fast():
+        settings.FAST_JSON_LISTINGS = True
+        try:
+            return listing_response(rows, Response()).body
+        finally:
+            settings.FAST_JSON_LISTINGS = False
+
+    assert json.loads(response_model()) == json.loads(fast()), "orjson output differs from the response model's"
+    results = {name: cpu_ms(fn, args.repeat) for name, fn in
+               (("model_per_row", model_per_row), ("asdict_response_model", asdict_response_model),
+                ("response_model", response_model), ("orjson", fast))}
+    baseline = results["model_per_row"]
+    print(f"{len(rows):,} rows, best of {args.repeat}, CPU time:")
+    for name, ms in results.items():
+        print(f"  {name:22s} {ms:8.1f} ms  ({baseline / ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark GET /transactions/: the old N+1 listing against the joined, keyset-paginated
+and streamed listing.
+
+Seeds a SQLite database and runs each path in its own subprocess so peak RSS is
+measured independently:
+
+    python -m benchmarks.bench_list_transactions --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+
+def run_old():
+    """The pre-rewrite implementation: load every row, then two lookups per row."""
+    from database.db import SessionLocal
+    from models.stock import Stocks
+    from models.transaction import Transaction
+    from models.users import Users
+    from schemas.transaction_schema import TransactionResponse
+
+    db = SessionLocal()
+    response = []
+    for transaction in db.query(Transaction).all():
+        user = db.query(Users).filter(Users.id == transaction.user_id).first()
+        stock = db.query(Stocks).filter(Stocks.id == transaction.ticker_id).first()
+        response.append(TransactionResponse(
+            id=transaction.id,
+            transaction_volume=transaction.transaction_volume,
+            transaction_type=transaction.transaction_type,
+            transaction_price=transaction.transaction_price,
+            created_time=transaction.created_time,
+            username=user.username,
+            ticker=stock.ticker
+        ))
+    db.close()
+    return len(response)
+
+
+async def run_stream():
+    from routes.transaction_routes import stream_transaction_rows
+
+    count = 0
+    async for _ in stream_transaction_rows("ndjson", None):
+        count += 1
+    return count
+
+
+async def run_pages(page_size: int = 1000):
+    from database.db import AsyncSessionLocal
+    from routes.transaction_routes import after_cursor, transaction_rows_query
+
+    count, position = 0, None
+    async with AsyncSessionLocal() as db:
+        while True:
+            rows = (await db.execute(after_cursor(transaction_rows_query(), position).limit(page_size))).all()
+            count += len(rows)
+            if len(rows) < page_size:
+                break
+            position = (rows[-1].created_time, rows[-1].id)
+    return count
+
+
+MODES = {"old": run_old, "stream": run_stream, "pages": run_pages}
+
+
+def child(mode: str):
+    started = time.perf_counter()
+    rows = MODES[mode]()
+    if asyncio.iscoroutine(rows):
+        rows = asyncio.run(rows)
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>6}: {rows} rows in {elapsed:8.2f}s ({rows / elapsed:,.0f} rows/s), peak RSS {peak_mb:,.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", default=temp_sqlite_path("bench_transactions"))
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--modes", default="old,stream,pages")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    if args.child:
+        child(args.child)
+        return
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        from benchmarks.seed import seed
+        from database.db import engine
+
+        seed(engine, transactions=args.rows)
+        print(f"seeded {args.rows} transactions in {time.perf_counter() - started:.1f}s")
+
+    for mode in args.modes.split(","):
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_list_transactions",
+                        "--db", args.db, "--child", mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
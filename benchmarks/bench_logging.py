@@ -0,0 +1,68 @@
+"""
+Request throughput of one uvicorn worker with logging off, with the handlers writing
+synchronously on the event loop, with the queued background writer, and with the
+writer plus INFO sampling at 10%.
+
+Every request logs its handler's INFO line and the access line; stdout goes to
+/dev/null and the rotating log file to a temp directory.
+
+    python -m benchmarks.bench_logging --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+
+import httpx
+
+from benchmarks.http_load import UvicornServer, run_load
+from benchmarks.seed import seed, temp_sqlite_path
+
+MODES = {
+    "off": {"LOG_LEVEL": "CRITICAL"},
+    "sync": {"LOG_QUEUE_SIZE": "0"},
+    "queued": {},
+    "queued_sampled": {"LOG_INFO_SAMPLE_RATE": "0.1"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_logging')}")
+    parser.add_argument("--app-dir", default=None)
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--stocks", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--format", choices=["json", "text"], default="json")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from database.db import engine
+
+    seed(engine, users=1, stocks=args.stocks)
+
+    def get_stock(client: httpx.AsyncClient, i: int):
+        return client.get(f"/stocks/T{random.randint(1, args.stocks)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as log_dir:
+        for mode, env in MODES.items():
+            env = {"LOG_FORMAT": args.format, "LOG_FILE": os.path.join(log_dir, f"{mode}.log"), **env}
+            with UvicornServer(args.database_url, port=args.port, app_dir=args.app_dir, env=env,
+                               stdout=subprocess.DEVNULL) as server:
+                async def drive():
+                    async with httpx.AsyncClient(base_url=server.base_url, timeout=60) as client:
+                        await run_load(client, get_stock, 200, args.concurrency)  # warm the stock cache
+                        return await run_load(client, get_stock, args.requests, args.concurrency)
+
+                results[mode] = asyncio.run(drive())
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
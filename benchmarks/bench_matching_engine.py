@@ -0,0 +1,61 @@
+"""
+Matching-engine throughput and latency on the in-memory order book alone (no DB):
+orders/sec over N synthetic limit orders around a drifting mid price, and latency
+percentiles of the match() calls that produced at least one fill.
+
+    python -m benchmarks.bench_matching_engine --orders 1000000
+"""
+import argparse
+import os
+import random
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--spread", type=float, default=0.5, help="Std. dev. of limit prices around the mid")
+    parser.add_argument("--cancel-ratio", type=float, default=0.1, help="Share of orders that cancel a resting one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from benchmarks.http_load import percentile
+    from services.order_book import BookOrder, OrderBook
+    from services.order_execution import BUY, SELL
+
+    rng = random.Random(args.seed)
+    mid = 100.0
+    orders = []
+    for order_id in range(1, args.orders + 1):
+        mid = max(1.0, mid + rng.gauss(0, 0.01))
+        side = BUY if rng.random() < 0.5 else SELL
+        price = round(mid + rng.gauss(0, args.spread), 2)
+        orders.append(BookOrder(order_id, rng.randint(1, 1000), side, max(price, 0.01), float(rng.randint(1, 100))))
+    cancels = {rng.randrange(1, args.orders) for _ in range(int(args.orders * args.cancel_ratio))}
+
+    book = OrderBook()
+    latencies, fills = [], 0
+    clock = time.perf_counter
+    started = clock()
+    for order in orders:
+        before = clock()
+        produced = book.match(order)
+        if produced:
+            latencies.append(clock() - before)
+            fills += len(produced)
+        if order.id in cancels:
+            book.cancel(rng.randrange(1, order.id + 1))
+    elapsed = clock() - started
+
+    depth = book.depth(1)
+    print(f"{args.orders:,} orders in {elapsed:.2f}s: {args.orders / elapsed:,.0f} orders/s, "
+          f"{fills:,} fills from {len(latencies):,} matching orders")
+    print("per-match latency: " + ", ".join(
+        f"p{pct} {percentile(latencies, pct) * 1e6:.1f} us" for pct in (50, 90, 99, 99.9)
+    ))
+    print(f"resting orders: {len(book.orders):,}; top of book: {depth['bids'][:1]} / {depth['asks'][:1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+POST /stocks/ latency while the Celery broker is degraded.
+
+Runs Celery against the in-memory broker (or eagerly with --eager) and slows every
+publish down by --broker-delay seconds, as a stalled Redis would. Reports the
+request latency, which no longer includes publishing, then how long the outbox
+relay takes to hand every notification over. For comparison it times one delayed
+publish: the cost the old inline `.delay()` added to every request.
+
+Setting OUTBOX_PUBLISH_TIMEOUT below --broker-delay simulates a broker that is down:
+batches then run in-process. On SQLite keep --concurrency low, as its single writer
+dominates the tail otherwise.
+
+    python -m benchmarks.bench_notifications --stocks 500 --broker-delay 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+
+async def run(args):
+    import httpx
+    from benchmarks.http_load import run_load
+    from common.authentication import create_access_token
+    from config.tasks import notify_new_stocks
+    from scripts.run import app
+    from services.outbox import outbox_relay
+
+    publish = outbox_relay.publish
+
+    def degraded_publish(task, payloads):
+        time.sleep(args.broker_delay)
+        publish(task, payloads)
+
+    outbox_relay.publish = degraded_publish
+    started = time.perf_counter()
+    degraded_publish(notify_new_stocks, [])
+    inline = time.perf_counter() - started
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user1', 'uid': 1})}"}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            result = await run_load(client, lambda client, i: client.post("/stocks/", json={
+                "ticker": f"N{i}", "stock_name": f"New {i}", "stock_price": 10.0,
+            }), args.stocks, args.concurrency)
+        started = time.perf_counter()
+        while outbox_relay.published + outbox_relay.ran_locally < args.stocks:
+            await asyncio.sleep(0.01)
+        drained = time.perf_counter() - started
+
+    print(f"inline publish (old path) : {inline * 1000:8.1f} ms added to every request")
+    print(f"POST /stocks/ with outbox : p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"{result['throughput_rps']} req/s, {result['errors']} errors")
+    print(f"relay drained {args.stocks} events {drained:.2f}s after the last request: {outbox_relay.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_notifications')}")
+    parser.add_argument("--stocks", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--broker-delay", type=float, default=0.5)
+    parser.add_argument("--eager", action="store_true", help="Use task_always_eager instead of the memory broker")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["CELERY_BROKER_URL"] = "memory://"
+    os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+    os.environ["CELERY_TASK_ALWAYS_EAGER"] = "1" if args.eager else "0"
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=1, stocks=1)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
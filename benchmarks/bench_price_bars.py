@@ -0,0 +1,51 @@
+"""
+Build OHLCV bars at every interval over synthetic ticks with the vectorized
+aggregator, in one pass and incrementally in chunks as the recorder would.
+
+    python -m benchmarks.bench_price_bars --ticks 10000000 --stocks 500
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ticks", type=int, default=10_000_000)
+    parser.add_argument("--stocks", type=int, default=500)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--chunk", type=int, default=100_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from services.price_history import INTERVALS, aggregate_bars
+
+    rng = np.random.default_rng(0)
+    stock_ids = rng.integers(1, args.stocks + 1, args.ticks)
+    timestamps = np.sort(rng.uniform(1.7e9, 1.7e9 + args.days * 86400, args.ticks))
+    prices = rng.uniform(10, 1000, args.ticks)
+    volumes = rng.integers(0, 100, args.ticks).astype(np.float64)
+
+    for interval, seconds in INTERVALS.items():
+        started = time.perf_counter()
+        bars = aggregate_bars(stock_ids, timestamps, prices, volumes, seconds)
+        elapsed = time.perf_counter() - started
+        print(f"{interval:>3}: {len(bars[0]):>10,} bars from {args.ticks:,} ticks in {elapsed:6.2f}s "
+              f"({args.ticks / elapsed / 1e6:.1f}M ticks/s)")
+
+    started = time.perf_counter()
+    produced = 0
+    for offset in range(0, args.ticks, args.chunk):
+        window = slice(offset, offset + args.chunk)
+        for seconds in INTERVALS.values():
+            produced += len(aggregate_bars(stock_ids[window], timestamps[window], prices[window],
+                                           volumes[window], seconds)[0])
+    elapsed = time.perf_counter() - started
+    print(f"incremental, {args.chunk:,}-tick flushes, all intervals: {elapsed:.2f}s "
+          f"({args.ticks / elapsed / 1e6:.1f}M ticks/s, {produced:,} bar upserts)")
+
+
+if __name__ == "__main__":
+    main()
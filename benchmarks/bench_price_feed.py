@@ -0,0 +1,73 @@
+"""
+Delivery latency of the price feed hub with many subscribers: time from publish()
+on the request path to the event being taken off each subscriber's queue, with the
+in-memory backend and one asyncio task per simulated subscriber.
+
+    python -m benchmarks.bench_price_feed --subscribers 10000 --rate 2000 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+
+async def run(args):
+    from benchmarks.http_load import percentile
+    from services.price_feed import TRADE, LocalBackend, PriceFeedHub
+
+    hub = PriceFeedHub(args.window, LocalBackend(), args.max_pending)
+    hub.start()
+    latencies = []
+
+    async def consume(subscriber):
+        while True:
+            events = await subscriber.get()
+            now = time.time()
+            latencies.extend(now - event["time"] for event in events)
+
+    rng = random.Random(0)
+    subscribers = [hub.subscribe(rng.sample(range(1, args.stocks + 1), args.tickers_per_subscriber))
+                   for _ in range(args.subscribers)]
+    consumers = [asyncio.create_task(consume(subscriber)) for subscriber in subscribers]
+
+    published = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.seconds:
+        tick = time.perf_counter()
+        for _ in range(max(1, args.rate // 100)):
+            hub.publish(TRADE, rng.randint(1, args.stocks), 100.0, 1.0)
+            published += 1
+        await asyncio.sleep(max(0.0, 0.01 - (time.perf_counter() - tick)))
+    await asyncio.sleep(args.window * 5)
+    await hub.stop()
+    for consumer in consumers:
+        consumer.cancel()
+
+    stats = hub.stats()
+    print(f"{args.subscribers:,} subscribers x {args.tickers_per_subscriber} of {args.stocks} stocks, "
+          f"{published:,} events published over {args.seconds}s")
+    print(f"delivered {stats['delivered']:,} (received {len(latencies):,}), conflated {stats['conflated']:,}, "
+          f"dropped {stats['dropped']:,}")
+    print("delivery latency: " + ", ".join(
+        f"p{pct} {percentile(latencies, pct) * 1000:.1f} ms" for pct in (50, 95, 99)
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--stocks", type=int, default=200)
+    parser.add_argument("--tickers-per-subscriber", type=int, default=5)
+    parser.add_argument("--rate", type=int, default=2000, help="Events published per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--window", type=float, default=0.02, help="Hub flush interval")
+    parser.add_argument("--max-pending", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
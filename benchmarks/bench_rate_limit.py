@@ -0,0 +1,178 @@
+"""
+Overhead and behaviour of the rate limits and the load shedder.
+
+Overhead, CPU time per call:
+- bucket_take: LocalBucketStore.take over 10,000 keys
+- limiter_check: RateLimiter.check, the work a limited route adds
+- shedder: LoadSheddingMiddleware around an empty ASGI app, minus the bare app
+- route: a FastAPI route with the per-user limit as a dependency, minus the same
+  route without it, through the whole ASGI stack
+- route_noop_dependency: the same with a dependency that only takes the current user,
+  i.e. what FastAPI charges for any extra dependency
+
+Checks, with RATE_LIMIT_ORDERS=5/1 and RATE_LIMIT_LOGIN=5/60:
+- a bucket refuses the call after its burst and refills on a fake clock
+- the sixth order of a user within a second gets 429, another user's order passes
+- the sixth /login from one address gets 429 with Retry-After
+- past MAX_IN_FLIGHT_REQUESTS concurrent requests the rest get 503 with Retry-After
+
+    python -m benchmarks.bench_rate_limit
+
+Exits non-zero when any check fails.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+
+def report(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+
+async def cpu_us(make_call, calls: int) -> float:
+    started = time.process_time()
+    for i in range(calls):
+        await make_call(i)
+    return (time.process_time() - started) / calls * 1e6
+
+
+async def overhead(args):
+    import httpx
+    from fastapi import Depends, FastAPI
+
+    from common.authentication import Principal, create_access_token, get_current_user
+    from common.load_shedding import LoadShedder, LoadSheddingMiddleware
+    from common.rate_limit import Limit, LocalBucketStore, RateLimiter, limit_per_user
+
+    limit = Limit(1e9, 1e9)
+    store = LocalBucketStore(100_000)
+    limiter = RateLimiter(store)
+    keys = [f"orders:{i}" for i in range(10_000)]
+
+    async def empty_app(scope, receive, send):
+        pass
+
+    shedded = LoadSheddingMiddleware(empty_app, LoadShedder(10 ** 9, 1))
+    scope = {"type": "http", "method": "GET", "path": "/"}
+
+    results = {
+        "bucket_take": await cpu_us(lambda i: store.take(keys[i % 10_000], limit), args.calls),
+        "limiter_check": await cpu_us(lambda i: limiter.check("orders", i % 10_000, limit), args.calls),
+        "shedder": await cpu_us(lambda i: shedded(scope, None, None), args.calls)
+        - await cpu_us(lambda i: empty_app(scope, None, None), args.calls),
+    }
+
+    # a real token rather than dependency_overrides, which make FastAPI re-inspect
+    # the overridden dependency on every request
+    app = FastAPI()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user1', 'uid': 1})}"}
+
+    @app.get("/plain")
+    async def plain(current_user: Principal = Depends(get_current_user)):
+        return {}
+
+    @app.get("/limited", dependencies=[Depends(limit_per_user("bench", limit))])
+    async def limited(current_user: Principal = Depends(get_current_user)):
+        return {}
+
+    async def noop(current_user: Principal = Depends(get_current_user)):
+        pass
+
+    @app.get("/noop", dependencies=[Depends(noop)])
+    async def noop_dependency(current_user: Principal = Depends(get_current_user)):
+        return {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 headers=headers) as client:
+        # best of interleaved rounds, since a whole request costs hundreds of times more
+        requests = args.calls // 200
+        best = {"/plain": float("inf"), "/limited": float("inf"), "/noop": float("inf")}
+        for _ in range(10):
+            for path in best:
+                best[path] = min(best[path], await cpu_us(lambda i: client.get(path), requests))
+        results["route"] = best["/limited"] - best["/plain"]
+        results["route_noop_dependency"] = best["/noop"] - best["/plain"]
+
+    for name, micros in results.items():
+        print(f"{name:<22} {micros:8.2f} us/call")
+
+
+async def checks(args) -> bool:
+    import httpx
+
+    from common.authentication import create_access_token
+    from common.load_shedding import LoadShedder, LoadSheddingMiddleware
+    from common.rate_limit import Limit, LocalBucketStore
+    from scripts.run import app
+
+    ok = True
+    now = [0.0]
+    store = LocalBucketStore(10, clock=lambda: now[0])
+    limit = Limit(rate=2.0, burst=3)
+    waits = [await store.take("key", limit) for _ in range(4)]
+    now[0] += 0.5
+    refilled = await store.take("key", limit)
+    ok &= report("bucket burst and refill", waits[:3] == [0, 0, 0] and waits[3] == 0.5 and refilled == 0,
+                 f"waits {waits}, after 0.5s {refilled}")
+
+    def order(user_id: int):
+        return {"username": f"user{user_id}", "ticker": "T1", "transaction_volume": 1, "transaction_type": "BUY"}
+
+    def auth(user_id: int):
+        return {"Authorization": f"Bearer {create_access_token({'sub': f'user{user_id}', 'uid': user_id})}"}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        statuses = [(await client.post("/transactions", json=order(1), headers=auth(1))).status_code
+                    for _ in range(6)]
+        other = await client.post("/transactions", json=order(2), headers=auth(2))
+        ok &= report("orders limited per user", statuses == [201] * 5 + [429] and other.status_code == 201,
+                     f"user1 {statuses}, user2 {other.status_code}")
+
+        logins = [await client.post("/login", data={"username": "user1", "password": "wrong"}) for _ in range(6)]
+        ok &= report("logins limited per address",
+                     [r.status_code for r in logins] == [401] * 5 + [429] and "retry-after" in logins[-1].headers,
+                     f"{[r.status_code for r in logins]}, Retry-After {logins[-1].headers.get('retry-after')}")
+
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(0.1)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    shedder = LoadShedder(4, 1)
+    shedded = LoadSheddingMiddleware(slow_app, shedder)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=shedded), base_url="http://check") as client:
+        responses = await asyncio.gather(*(client.get("/") for _ in range(10)))
+        after = await client.get("/")
+    statuses = sorted(r.status_code for r in responses)
+    ok &= report("load shedding past 4 in flight",
+                 statuses == [200] * 4 + [503] * 6 and after.status_code == 200
+                 and all(r.headers.get("retry-after") == "1" for r in responses if r.status_code == 503),
+                 f"{statuses}, then {after.status_code}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_rate_limit')}")
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    os.environ.update({"DATABASE_URL": args.database_url, "RATE_LIMIT_ORDERS": "5/1", "RATE_LIMIT_LOGIN": "5/60",
+                       "BCRYPT_ROUNDS": "4"})
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from benchmarks.seed import seed
+    from common.authentication import get_password_hash
+    from database.db import engine
+
+    seed(engine, users=2, stocks=1, hashed_password=get_password_hash("secret"))
+    asyncio.run(overhead(args))
+    sys.exit(0 if asyncio.run(checks(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
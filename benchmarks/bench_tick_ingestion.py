@@ -0,0 +1,57 @@
+"""
+Sustained tick ingestion: a synthetic generator pushes random (ticker, price) ticks
+into the coalescer as fast as it can while the background flusher writes each
+window to the stocks table.
+
+    python -m benchmarks.bench_tick_ingestion --tickers 500 --seconds 10 --window 0.5
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+
+async def run(tickers: int, seconds: float, window: float, burst: int):
+    from database.db import async_engine
+    from services.tick_ingestion import TickCoalescer
+
+    coalescer = TickCoalescer(window)
+    names = [f"T{i}" for i in range(1, tickers + 1)]
+    coalescer.start()
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        coalescer.add_many((random.choice(names), random.uniform(1, 1000)) for _ in range(burst))
+        # Yield to the flusher between bursts, as a network-fed ingest would.
+        await asyncio.sleep(0)
+    await coalescer.stop()
+    elapsed = time.perf_counter() - started
+    await async_engine.dispose()
+
+    print(f"ingested {coalescer.received:,} ticks in {elapsed:.2f}s: {coalescer.received / elapsed:,.0f} ticks/s")
+    print(f"wrote {coalescer.written:,} price rows ({coalescer.written / elapsed:,.0f} rows/s, "
+          f"coalescing ratio {coalescer.received / max(coalescer.written, 1):,.0f}:1)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_ticks')}")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--window", type=float, default=0.5)
+    parser.add_argument("--burst", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=1, stocks=args.tickers)
+    asyncio.run(run(args.tickers, args.seconds, args.window, args.burst))
+
+
+if __name__ == "__main__":
+    main()
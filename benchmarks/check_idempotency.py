@@ -0,0 +1,160 @@
+"""
+Checks for Idempotency-Key on POST /transactions:
+
+1. concurrent duplicates on one worker place a single order and all get its response;
+2. a replay is served without touching users or stocks: from memory with no SQL at
+   all, and after the in-process cache is dropped, from idempotency_keys alone;
+3. reusing a key for a different body is rejected with 422;
+4. a rejected order is not stored, so retrying it runs it again;
+5. concurrent duplicates split across two uvicorn workers on the same database
+   place a single order.
+
+    python -m benchmarks.check_idempotency --duplicates 50
+
+Exits non-zero when any check fails.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import uuid
+
+from benchmarks.seed import temp_sqlite_path
+
+PRICE = 100.0
+BALANCE = 1_000_000.0
+
+
+def account(engine, user_id: int):
+    """Balance and number of transactions of a user."""
+    from sqlalchemy import func, select
+    from models.transaction import Transaction
+    from models.users import Users
+
+    with engine.connect() as conn:
+        balance = conn.execute(select(Users.balance).where(Users.id == user_id)).scalar()
+        count = conn.execute(select(func.count()).where(Transaction.user_id == user_id)).scalar()
+    return balance, count
+
+
+def report(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+
+def order(user_id: int, volume: float = 1):
+    return {"username": f"user{user_id}", "ticker": "T1", "transaction_volume": volume, "transaction_type": "BUY"}
+
+
+def headers(user_id: int, key: str):
+    from common.authentication import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': f'user{user_id}', 'uid': user_id})}",
+            "Idempotency-Key": key}
+
+
+async def check_one_worker(args) -> bool:
+    import httpx
+    from sqlalchemy import event
+    from database.db import async_engine, engine
+    from scripts.run import app
+    from services.idempotency import REPLAYED_HEADER, idempotency_store
+
+    ok = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        key = uuid.uuid4().hex
+        responses = await asyncio.gather(*(
+            client.post("/transactions", json=order(1), headers=headers(1, key)) for _ in range(args.duplicates)
+        ))
+        balance, count = account(engine, 1)
+        ids = {response.json().get("id") for response in responses}
+        replayed = sum(response.headers.get(REPLAYED_HEADER) == "true" for response in responses)
+        ok &= report(
+            f"{args.duplicates} concurrent duplicates",
+            all(r.status_code == 201 for r in responses) and len(ids) == 1 and count == 1
+            and balance == BALANCE - PRICE and replayed == args.duplicates - 1,
+            f"{count} transaction(s), balance {balance}, {len(ids)} distinct id(s), {replayed} replayed"
+        )
+
+        statements = []
+
+        @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        replay = await client.post("/transactions", json=order(1), headers=headers(1, key))
+        ok &= report("replay from memory runs no SQL", replay.json() == responses[0].json() and not statements,
+                     f"{len(statements)} statement(s)")
+        idempotency_store.clear()
+        statements.clear()
+        replay = await client.post("/transactions", json=order(1), headers=headers(1, key))
+        touched = [s for s in statements if " users" in s or " stocks" in s]
+        ok &= report("replay from the database reads only idempotency_keys",
+                     replay.json() == responses[0].json() and statements and not touched,
+                     f"{len(statements)} statement(s), {len(touched)} on users or stocks")
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+        mismatch = await client.post("/transactions", json=order(1, 2), headers=headers(1, key))
+        ok &= report("key reused for a different body", mismatch.status_code == 422, str(mismatch.status_code))
+
+        key = uuid.uuid4().hex
+        too_big = order(1, BALANCE)
+        first = await client.post("/transactions", json=too_big, headers=headers(1, key))
+        again = await client.post("/transactions", json=too_big, headers=headers(1, key))
+        ok &= report("rejected order is not stored",
+                     first.status_code == again.status_code == 400 and REPLAYED_HEADER.lower() not in again.headers,
+                     f"{first.status_code}, then {again.status_code}")
+    return ok
+
+
+async def check_two_workers(args) -> bool:
+    import httpx
+    from benchmarks.http_load import UvicornServer
+    from database.db import engine
+    from services.idempotency import REPLAYED_HEADER
+
+    key = uuid.uuid4().hex
+    with UvicornServer(args.database_url, port=args.port, stdout=subprocess.DEVNULL) as first, \
+            UvicornServer(args.database_url, port=args.port + 1, stdout=subprocess.DEVNULL) as second:
+        async with httpx.AsyncClient(timeout=60) as client:
+            responses = await asyncio.gather(*(
+                client.post((first if i % 2 else second).base_url + "/transactions", json=order(2),
+                            headers=headers(2, key))
+                for i in range(args.duplicates)
+            ))
+    balance, count = account(engine, 2)
+    ids = {response.json().get("id") for response in responses}
+    replayed = sum(response.headers.get(REPLAYED_HEADER) == "true" for response in responses)
+    return report(
+        f"{args.duplicates} concurrent duplicates across two workers",
+        all(r.status_code == 201 for r in responses) and len(ids) == 1 and count == 1
+        and balance == BALANCE - PRICE and replayed == args.duplicates - 1,
+        f"{count} transaction(s), balance {balance}, {len(ids)} distinct id(s), {replayed} replayed, "
+        f"statuses {sorted({r.status_code for r in responses})}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('check_idempotency')}")
+    parser.add_argument("--duplicates", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8772)
+    args = parser.parse_args()
+
+    from benchmarks.http_load import UNLIMITED_ENV
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.update(UNLIMITED_ENV)
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=2, stocks=1, balance=BALANCE)
+    ok = asyncio.run(check_one_worker(args))
+    ok &= asyncio.run(check_two_workers(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Checks that keyset pagination walks every row exactly once for transactions placed
+through POST /transactions (not seeded rows, whose timestamps the seeder formats):
+
+1. GET /transactions/ followed page by page through X-Next-Cursor.
+2. GET /transactions/{username}/by-date the same way, from the exact created_time of
+   the second order, which must itself be included.
+
+    python -m benchmarks.check_pagination --orders 7 --page-size 3
+
+Exits non-zero when any check fails.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from benchmarks.seed import temp_sqlite_path
+
+
+def report(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+
+async def paginate(client, path: str, params: dict) -> list:
+    """Every row returned while following X-Next-Cursor, at most 1000 pages."""
+    rows, cursor = [], None
+    for _ in range(1000):
+        response = await client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        response.raise_for_status()
+        rows += response.json()
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    return rows
+
+
+async def check(args) -> bool:
+    import httpx
+    from common.authentication import create_access_token
+    from scripts.run import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user1', 'uid': 1})}"}
+    order = {"username": "user1", "ticker": "T1", "transaction_volume": 1, "transaction_type": "BUY"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        placed = []
+        for _ in range(args.orders):
+            response = await client.post("/transactions", json=order, headers=headers)
+            response.raise_for_status()
+            placed.append(response.json()["id"])
+
+        rows = await paginate(client, "/transactions/", {"limit": args.page_size})
+        listed = [row["id"] for row in rows]
+        ok = report("GET /transactions/ pages", listed == placed,
+                    f"{len(listed)} of {len(placed)} rows over pages of {args.page_size}")
+
+        start_time = rows[1]["created_time"] if len(rows) > 1 else "1970-01-01T00:00:00"
+        rows = await paginate(client, "/transactions/user1/by-date", {
+            "start_time": start_time, "end_time": "2999-01-01T00:00:00", "limit": args.page_size
+        })
+        by_date = [row["id"] for row in rows]
+        ok &= report("GET /transactions/{username}/by-date pages", by_date == placed[1:],
+                     f"{len(by_date)} of {len(placed) - 1} rows from {start_time}")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('check_pagination')}")
+    parser.add_argument("--orders", type=int, default=7)
+    parser.add_argument("--page-size", type=int, default=3)
+    args = parser.parse_args()
+
+    from benchmarks.http_load import UNLIMITED_ENV
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.update(UNLIMITED_ENV)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=1, stocks=1)
+    sys.exit(0 if asyncio.run(check(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
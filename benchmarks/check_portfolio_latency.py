@@ -0,0 +1,153 @@
+"""
+Checks for GET /users/{username}/portfolio:
+
+1. a position bought, sold off and bought again is valued at the new buys' cost,
+   with the sale's P&L booked when it happened;
+2. the holdings maintained incrementally by order execution (single orders and a
+   batch) match a rebuild from the transactions table;
+3. endpoint latency stays flat as the user's transaction count grows.
+
+    python -m benchmarks.check_portfolio_latency --sizes 100,10000,200000
+
+Exits non-zero when either check fails.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+
+async def place_orders(client, count: int):
+    for _ in range(count):
+        side = random.choice(("BUY", "BUY", "SELL"))
+        await client.post("/transactions", json={
+            "username": "user1", "ticker": f"T{random.randint(1, 5)}",
+            "transaction_volume": random.randint(1, 5), "transaction_type": side,
+        })
+
+
+async def check_round_trip(client, engine) -> bool:
+    """user2 buys 10 T1 at 100, sells them at 120, then buys 5 at 50 in a batch after selling none."""
+    from sqlalchemy import text
+    from common.authentication import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user2', 'uid': 2})}"}
+
+    async def trade(price: float, side: str, volume: int):
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE stocks SET stock_price = :price WHERE ticker = 'T1'"), {"price": price})
+        order = {"username": "user2", "ticker": "T1", "transaction_volume": volume, "transaction_type": side}
+        response = await client.post("/transactions/batch", json=[order], headers=headers)
+        assert response.status_code == 201, response.text
+
+    await trade(100.0, "BUY", 10)
+    await trade(120.0, "SELL", 10)
+    await trade(50.0, "BUY", 5)
+    position = (await client.get("/users/user2/portfolio")).json()["positions"][0]
+    ok = (position["quantity"] == 5 and position["average_cost"] == 50.0
+          and position["unrealized_pnl"] == 0.0 and position["realized_pnl"] == 200.0)
+    print(f"buy, sell, buy again: average cost {position['average_cost']} (want 50.0), "
+          f"unrealized {position['unrealized_pnl']} (want 0.0), realized {position['realized_pnl']} "
+          f"(want 200.0){'' if ok else ' FAIL'}")
+    return ok
+
+
+def holdings_snapshot(engine):
+    from sqlalchemy import select
+    from models.holdings import Holdings
+
+    with engine.connect() as conn:
+        return {
+            (row.user_id, row.stock_id): tuple(round(value, 6) for value in row[2:])
+            for row in conn.execute(select(Holdings).order_by(Holdings.user_id, Holdings.stock_id))
+        }
+
+
+def add_history(engine, count: int, stocks: int):
+    """Append `count` transactions for user 1, then rebuild holdings from them."""
+    from models.transaction import Transaction
+    from services.portfolio import rebuild_holdings
+
+    with engine.begin() as conn:
+        for offset in range(0, count, 50_000):
+            conn.execute(Transaction.__table__.insert(), [{
+                "user_id": 1,
+                "ticker_id": random.randint(1, stocks),
+                "transaction_type": "BUY",
+                "transaction_volume": 1.0,
+                "transaction_price": 100.0,
+            } for _ in range(min(50_000, count - offset))])
+        rebuild_holdings(conn)
+
+
+async def time_portfolio(client, requests: int) -> float:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get("/users/user1/portfolio")
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+    return statistics.median(samples)
+
+
+async def run(args) -> bool:
+    import httpx
+    from common.authentication import create_access_token
+    from database.db import engine
+    from scripts.run import app
+    from services.portfolio import rebuild_holdings
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user1', 'uid': 1})}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check", headers=headers) as client:
+        round_trip = await check_round_trip(client, engine)
+        await place_orders(client, args.orders)
+        incremental = holdings_snapshot(engine)
+        with engine.begin() as conn:
+            rebuild_holdings(conn)
+        rebuilt = holdings_snapshot(engine)
+        consistent = incremental == rebuilt
+        print(f"incremental holdings {'match' if consistent else 'DIFFER FROM'} the rebuild "
+              f"({len(rebuilt)} positions)")
+
+        medians, total = [], 0
+        for size in map(int, args.sizes.split(",")):
+            add_history(engine, size - total, args.stocks)
+            total = size
+            medians.append(await time_portfolio(client, args.requests))
+            print(f"{size:>10,} transactions: median {medians[-1] * 1000:.2f} ms")
+
+    flat = max(medians) <= args.tolerance * min(medians)
+    print(f"latency {'flat' if flat else 'GROWS'} (max/min = {max(medians) / min(medians):.2f}, "
+          f"tolerance {args.tolerance})")
+    return round_trip and consistent and flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_portfolio')}")
+    parser.add_argument("--sizes", default="100,10000,200000")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--stocks", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    args = parser.parse_args()
+
+    from benchmarks.http_load import UNLIMITED_ENV
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.update(UNLIMITED_ENV)
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=2, stocks=args.stocks, balance=1e12)
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Checks read-replica routing with a second SQLite file standing in for the replica.
+Both files are seeded alike and never synced afterwards, so the replica is a replica
+lagging behind every write the checks make:
+
+1. A write through the API sets the db_primary_until cookie.
+2. The writing client's reads go to the primary and see the write; a client without
+   the cookie reads the replica (RoutingSession.get_bind) and does not.
+3. A write issued on a read-only session still lands on the primary.
+4. After a price update invalidates the stock caches, a client without the cookie
+   gets the new price from GET /stocks/{ticker} and GET /stocks/, i.e. the shared
+   caches were refilled from the primary, not the replica.
+5. The same when the refill happens in a replica-routed endpoint (by-date with ticker).
+6. After a trade, a client without the cookie gets the new balance from GET /users/{username}.
+
+    python -m benchmarks.check_read_replica
+
+Exits non-zero when any check fails.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from benchmarks.seed import temp_sqlite_path
+
+
+def report(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+
+async def check() -> bool:
+    import httpx
+    from sqlalchemy import select, update
+
+    from common.authentication import create_access_token
+    from database.db import PRIMARY_UNTIL_COOKIE, AsyncSessionLocal, async_engine, replica_engine
+    from models.stock import Stocks
+    from scripts.run import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user1', 'uid': 1})}"}
+    order = {"username": "user1", "ticker": "T1", "transaction_volume": 1, "transaction_type": "BUY"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as writer, \
+            httpx.AsyncClient(transport=transport, base_url="http://check") as reader:
+        # prime the shared caches with the seeded values
+        balance = (await reader.get("/users/user1")).json()["balance"]
+        for path in ("/stocks/T1", "/stocks/T2", "/stocks/"):
+            (await reader.get(path)).raise_for_status()
+
+        response = await writer.post("/transactions", json=order, headers=headers)
+        response.raise_for_status()
+        ok = report("write sets the cookie", PRIMARY_UNTIL_COOKIE in response.cookies,
+                    response.headers.get("set-cookie", "no set-cookie header"))
+
+        own = await writer.get("/transactions/user/user1")
+        others = await reader.get("/transactions/user/user1")
+        ok &= report("reads routed by cookie", own.status_code == 200 and others.status_code == 404,
+                     f"writer {own.status_code} reading the primary, reader {others.status_code} the replica")
+
+        async with AsyncSessionLocal(info={"read_only": True}) as db:
+            await db.execute(update(Stocks).where(Stocks.ticker == "T3").values(stock_price=103))
+            await db.commit()
+        async with async_engine.connect() as primary, replica_engine.connect() as replica:
+            on_primary = (await primary.execute(select(Stocks.stock_price).where(Stocks.ticker == "T3"))).scalar()
+            on_replica = (await replica.execute(select(Stocks.stock_price).where(Stocks.ticker == "T3"))).scalar()
+        ok &= report("read-only session writes to the primary", on_primary == 103 and on_replica == 100,
+                     f"primary {on_primary}, replica {on_replica}")
+
+        response = await writer.put("/stocks/prices", json=[{"ticker": "T1", "stock_price": 150}], headers=headers)
+        response.raise_for_status()
+        single = (await reader.get("/stocks/T1")).json()["stock_price"]
+        listed = {stock["ticker"]: stock["stock_price"] for stock in (await reader.get("/stocks/")).json()}["T1"]
+        ok &= report("stock caches refilled from the primary", single == 150 and listed == 150,
+                     f"GET /stocks/T1 {single}, GET /stocks/ {listed}, expected 150")
+
+        response = await writer.put("/stocks/prices", json=[{"ticker": "T2", "stock_price": 120}], headers=headers)
+        response.raise_for_status()
+        (await reader.get("/transactions/user1/by-date", params={
+            "start_time": "1970-01-01T00:00:00", "end_time": "2999-01-01T00:00:00", "ticker": "T2"
+        })).raise_for_status()
+        single = (await reader.get("/stocks/T2")).json()["stock_price"]
+        ok &= report("replica-routed endpoint refills from the primary", single == 120,
+                     f"GET /stocks/T2 {single} after a by-date read, expected 120")
+
+        fresh = (await reader.get("/users/user1")).json()["balance"]
+        ok &= report("user cache refilled from the primary", fresh < balance,
+                     f"balance {fresh} after the trade, {balance} before")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('check_read_replica')}")
+    parser.add_argument("--replica-url", default=f"sqlite:///{temp_sqlite_path('check_read_replica_replica')}")
+    args = parser.parse_args()
+
+    from benchmarks.http_load import UNLIMITED_ENV
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DATABASE_REPLICA_URL"] = args.replica_url
+    os.environ.update(UNLIMITED_ENV)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from sqlalchemy import create_engine
+
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=1, stocks=3)
+    seed(create_engine(args.replica_url), users=1, stocks=3)
+    sys.exit(0 if asyncio.run(check()) else 1)
+
+
+if __name__ == "__main__":
+    main()
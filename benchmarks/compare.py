@@ -0,0 +1,62 @@
+"""
+Compare two benchmarks.suite result files and flag regressions.
+
+A scenario regresses when its throughput drops or its p95 latency rises by more than
+--threshold percent, or when it runs at least one more SQL statement per request on
+average (cache hit rates move the count by fractions). Exits 1 if any does.
+
+    python -m benchmarks.compare baseline.json results.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['meta'].get('revision')}  candidate {candidate['meta'].get('revision')}")
+    print(f"{'scenario':26s} {'rps':>18s} {'p95 ms':>18s} {'queries/req':>14s}")
+    regressions = []
+    for name, new in candidate["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            print(f"{name:26s} (new)")
+            continue
+        rps = change(old["throughput_rps"], new["throughput_rps"])
+        p95 = change(old["p95_ms"], new["p95_ms"])
+        queries_old, queries_new = old.get("queries_per_request"), new.get("queries_per_request")
+        flags = []
+        if rps < -args.threshold:
+            flags.append("throughput")
+        if p95 > args.threshold:
+            flags.append("p95")
+        if queries_old is not None and queries_new is not None and queries_new - queries_old >= 1:
+            flags.append("queries")
+        if new.get("errors", 0) > old.get("errors", 0):
+            flags.append("errors")
+        if flags:
+            regressions.append(name)
+        print(f"{name:26s} {new['throughput_rps']:9.1f} {rps:+7.1f}% {new['p95_ms']:9.2f} {p95:+7.1f}% "
+              f"{queries_old!s:>6s} -> {queries_new!s:<6s} {'REGRESSED: ' + ', '.join(flags) if flags else ''}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
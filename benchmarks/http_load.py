@@ -0,0 +1,93 @@
+"""Fixed-concurrency HTTP load driver and uvicorn launcher shared by the load tests."""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+# Load drivers hit the API from one address with a handful of users; the rate limits
+# and the load shedder would turn that load into 429s and 503s.
+UNLIMITED_ENV = {"RATE_LIMIT_ORDERS": "", "RATE_LIMIT_LOGIN": "", "MAX_IN_FLIGHT_REQUESTS": "0"}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_load(client: httpx.AsyncClient, make_request: Callable[[httpx.AsyncClient, int], "asyncio.Future"],
+                   total: int, concurrency: int) -> Dict[str, float]:
+    """
+    Issue `total` requests with at most `concurrency` in flight.
+    `make_request(client, i)` must return an awaitable resolving to an httpx.Response.
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+class UvicornServer:
+    """Runs `scripts.run:app` under uvicorn with one worker in a subprocess."""
+
+    def __init__(self, database_url: str, port: int = 8765, app_dir: Optional[str] = None,
+                 env: Optional[Dict[str, str]] = None, stdout=None):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.app_dir = app_dir or os.getcwd()
+        self.env = {**os.environ, **UNLIMITED_ENV, "DATABASE_URL": database_url, **(env or {})}
+        self.stdout = stdout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "scripts.run:app", "--workers", "1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=self.app_dir, env=self.env, stdout=self.stdout
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                httpx.get(self.base_url + "/docs", timeout=1)
+                return self
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError("uvicorn did not start")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=10)
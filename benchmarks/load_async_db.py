@@ -0,0 +1,54 @@
+"""
+Concurrent-request throughput of the read routes under uvicorn with one worker.
+
+Run it once on this tree and once on a checkout from before the async data layer
+(e.g. `git worktree add /tmp/before <rev>` and `--app-dir /tmp/before`) to compare
+the blocking Session against AsyncSession:
+
+    python -m benchmarks.load_async_db --concurrency 64 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.http_load import UvicornServer, run_load
+from benchmarks.seed import seed, temp_sqlite_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_load')}")
+    parser.add_argument("--app-dir", default=None)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    if not args.skip_seed:
+        seed(create_engine(args.database_url), users=args.users, transactions=args.transactions)
+
+    def make_request(client: httpx.AsyncClient, i: int):
+        user = random.randint(1, args.users)
+        path = random.choice((f"/users/user{user}", f"/stocks/T{user % 200 + 1}", f"/transactions/user/user{user}"))
+        return client.get(path)
+
+    with UvicornServer(args.database_url, port=args.port, app_dir=args.app_dir) as server:
+        async def drive():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=server.base_url, limits=limits, timeout=60) as client:
+                return await run_load(client, make_request, args.requests, args.concurrency)
+
+        print(json.dumps(asyncio.run(drive()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
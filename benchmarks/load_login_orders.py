@@ -0,0 +1,67 @@
+"""
+Order latency while logins run on the same uvicorn worker.
+
+Phase 1 drives POST /transactions alone; phase 2 drives the same order load while
+a second client hammers POST /login. With bcrypt on the event loop the order p99
+jumps by the hash time on every login; with the hashing pool it should barely move.
+
+    python -m benchmarks.load_login_orders --orders 2000 --logins 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+import httpx
+
+from benchmarks.http_load import UvicornServer, run_load
+from benchmarks.seed import seed, temp_sqlite_path
+
+PASSWORD = "secret"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_login')}")
+    parser.add_argument("--app-dir", default=None)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--order-concurrency", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--login-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from common.authentication import create_access_token, get_password_hash
+    from database.db import engine
+
+    seed(engine, users=args.users, balance=1e12, hashed_password=get_password_hash(PASSWORD))
+
+    def order(client: httpx.AsyncClient, i: int):
+        user = random.randint(1, args.users)
+        token = create_access_token({"sub": f"user{user}", "uid": user})
+        return client.post("/transactions", headers={"Authorization": f"Bearer {token}"}, json={
+            "username": f"user{user}", "ticker": f"T{random.randint(1, 200)}",
+            "transaction_volume": 1, "transaction_type": "BUY",
+        })
+
+    def login(client: httpx.AsyncClient, i: int):
+        return client.post("/login", data={"username": f"user{random.randint(1, args.users)}", "password": PASSWORD})
+
+    with UvicornServer(args.database_url, port=args.port, app_dir=args.app_dir) as server:
+        async def drive():
+            async with httpx.AsyncClient(base_url=server.base_url, timeout=120) as client:
+                alone = await run_load(client, order, args.orders, args.order_concurrency)
+                with_logins, logins = await asyncio.gather(
+                    run_load(client, order, args.orders, args.order_concurrency),
+                    run_load(client, login, args.logins, args.login_concurrency),
+                )
+            return {"orders_alone": alone, "orders_during_logins": with_logins, "logins": logins}
+
+        print(json.dumps(asyncio.run(drive()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Bulk loaders shared by the benchmarks. Users and stocks go through the synchronous
+engine with executemany; transactions, which can run into the millions, bypass
+SQLAlchemy: COPY on PostgreSQL, a raw DBAPI executemany of tuples elsewhere.
+"""
+import csv
+import io
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+CHUNK_SIZE = 50_000
+TRANSACTION_COLUMNS = ("user_id", "ticker_id", "transaction_type", "transaction_volume", "transaction_price",
+                       "created_time")
+
+
+def temp_sqlite_path(name: str) -> str:
+    """A SQLite file in a new temporary directory, where the benchmarks put their database by default."""
+    return os.path.join(tempfile.mkdtemp(prefix="bench-"), f"{name}.sqlite3")
+
+
+def copy_rows(conn, table: str, columns, rows):
+    """Load tuples into a table on the connection's DBAPI cursor, skipping SQLAlchemy's per-row work."""
+    cursor = conn.connection.cursor()
+    try:
+        if conn.dialect.name == "postgresql":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            placeholders = ", ".join("?" * len(columns))
+            cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+    finally:
+        cursor.close()
+
+
+def transaction_rows(first: int, count: int, users: int, stocks: int, start: datetime):
+    """
+    Random transaction tuples one second apart, in the text form SQLAlchemy stores
+    timestamps in on SQLite (PostgreSQL parses it too). Kept to cheap calls, since
+    generating rows costs more than inserting them.
+    """
+    rand = random.random
+    sides = ("BUY", "SELL")
+    second = timedelta(seconds=1)
+    created_time = start + first * second
+    rows = []
+    for _ in range(count):
+        rows.append((int(rand() * users) + 1, int(rand() * stocks) + 1, sides[rand() < 0.5],
+                     float(int(rand() * 100) + 1), float(int(rand() * 9901) + 100),
+                     created_time.isoformat(" ") + ".000000"))
+        created_time += second
+    return rows
+
+
+def seed(engine, users: int = 1000, stocks: int = 200, transactions: int = 0, balance: float = 1e9,
+         hashed_password: str = "x", recreate: bool = True):
+    """
+    Drop and recreate every table, then load users `user<N>`, stocks `T<N>` and random transactions.
+    With recreate=False the existing (e.g. migrated) schema is loaded as is.
+    """
+    from database.db import Base
+    from models.holdings import Holdings  # noqa: F401
+    from models.idempotency import IdempotencyKey  # noqa: F401
+    from models.order import Order  # noqa: F401
+    from models.outbox import OutboxEvent  # noqa: F401
+    from models.price_history import PriceBar, PriceTick  # noqa: F401
+    from models.stock import Stocks
+    from models.stock_stats import StockStats, StockStatsHourly  # noqa: F401
+    from models.transaction import Transaction
+    from models.users import Users
+
+    if recreate:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Users.__table__.insert(), [
+            {"id": i, "username": f"user{i}", "hashed_password": hashed_password, "balance": balance}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(Stocks.__table__.insert(), [
+            {"id": i, "ticker": f"T{i}", "stock_name": f"Stock {i}", "stock_price": 100.0}
+            for i in range(1, stocks + 1)
+        ])
+        if conn.dialect.name == "postgresql":
+            # ids were given explicitly, so move the sequences past them
+            for table in ("users", "stocks"):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                )
+        start = datetime(2024, 1, 1)
+        for offset in range(0, transactions, CHUNK_SIZE):
+            copy_rows(conn, Transaction.__tablename__, TRANSACTION_COLUMNS,
+                      transaction_rows(offset, min(CHUNK_SIZE, transactions - offset), users, stocks, start))
@@ -0,0 +1,90 @@
+"""
+Concurrency stress test for services.order_execution: fires parallel orders at one
+account and checks that no balance or holdings update was lost.
+
+    python -m benchmarks.stress_order_execution --orders 200
+
+The account is funded for exactly `--fill` one-share BUYs, so exactly that many of the
+parallel BUYs must succeed and the balance must end at zero; the same number of
+parallel SELLs then runs against the accumulated position. Exits non-zero on any
+mismatch.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from benchmarks.seed import temp_sqlite_path
+
+PRICE = 100.0  # what benchmarks.seed prices every stock at
+
+
+async def submit(side: str, user_id: int, stock_id: int):
+    from fastapi import HTTPException
+    from database.db import AsyncSessionLocal
+    from services.order_execution import execute_order
+
+    async with AsyncSessionLocal() as db:
+        try:
+            await execute_order(db, user_id, stock_id, side, 1)
+            return True
+        except HTTPException:
+            return False
+
+
+async def read_state(user_id: int, stock_id: int):
+    from sqlalchemy import func, select
+    from database.db import AsyncSessionLocal
+    from models.holdings import Holdings
+    from models.transaction import Transaction
+    from models.users import Users
+
+    async with AsyncSessionLocal() as db:
+        balance = (await db.execute(select(Users.balance).where(Users.id == user_id))).scalar()
+        quantity = (await db.execute(select(Holdings.quantity).where(
+            Holdings.user_id == user_id, Holdings.stock_id == stock_id
+        ))).scalar() or 0
+        trades = (await db.execute(select(func.count(Transaction.id)))).scalar()
+    return balance, quantity, trades
+
+
+async def run(orders: int, fill: int) -> bool:
+    from database.db import async_engine
+
+    ok = True
+    started = time.perf_counter()
+    bought = sum(await asyncio.gather(*(submit("BUY", 1, 1) for _ in range(orders))))
+    balance, quantity, trades = await read_state(1, 1)
+    print(f"BUY : {bought}/{orders} filled, balance={balance}, holdings={quantity}, transactions={trades}")
+    ok &= bought == fill and balance == 0 and quantity == fill and trades == fill
+
+    sold = sum(await asyncio.gather(*(submit("SELL", 1, 1) for _ in range(orders))))
+    balance, quantity, trades = await read_state(1, 1)
+    print(f"SELL: {sold}/{orders} filled, balance={balance}, holdings={quantity}, transactions={trades}")
+    ok &= sold == fill and balance == fill * PRICE and quantity == 0 and trades == 2 * fill
+
+    print(f"{2 * orders} orders in {time.perf_counter() - started:.2f}s")
+    await async_engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_orders')}")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--fill", type=int, default=150)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    from benchmarks.seed import seed
+    from database.db import engine
+
+    seed(engine, users=1, stocks=1, balance=args.fill * PRICE)
+    ok = asyncio.run(run(args.orders, args.fill))
+    print("OK: no lost updates" if ok else "FAILED: balance/holdings drifted")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
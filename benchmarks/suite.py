@@ -0,0 +1,174 @@
+"""
+End-to-end benchmark of the real app (scripts.run:app) on one uvicorn worker.
+
+Seeds users, stocks and transactions with the bulk loaders, then drives each scenario
+at fixed concurrency and records throughput, p50/p95/p99 latency and the SQL statements
+per request, read from /metrics. Results are written as JSON; compare two runs with
+benchmarks.compare.
+
+    python -m benchmarks.suite --transactions 1000000 --output results.json
+    python -m benchmarks.suite --database-url postgresql://... --skip-seed --output pg.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, NamedTuple, Tuple
+
+import httpx
+
+from benchmarks.http_load import UvicornServer, run_load
+from benchmarks.seed import seed, temp_sqlite_path
+
+PASSWORD = "secret"
+METRIC_LINE = re.compile(r'^http_request_db_queries_(sum|count)\{method="([^"]+)",route="([^"]+)"\} (\S+)$')
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    route: str
+    make_request: Callable
+    # fraction of --requests this scenario issues; streaming every row is far heavier
+    share: float = 1.0
+
+
+def build_scenarios(args, tokens) -> Tuple[Scenario, ...]:
+    def user():
+        return random.randint(1, args.users)
+
+    def auth(user_id: int):
+        return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+    def ticker():
+        return f"T{random.randint(1, args.stocks)}"
+
+    def order(client: httpx.AsyncClient, i: int):
+        user_id = user()
+        return client.post("/transactions", headers=auth(user_id), json={
+            "username": f"user{user_id}", "ticker": ticker(), "transaction_volume": 1, "transaction_type": "BUY",
+        })
+
+    def by_date(aggregate=None):
+        def request(client: httpx.AsyncClient, i: int):
+            params = {"start_time": "2024-01-01T00:00:00", "end_time": "2024-12-31T00:00:00", "limit": 100}
+            if aggregate:
+                params["aggregate"] = aggregate
+            return client.get(f"/transactions/user{user()}/by-date", params=params)
+        return request
+
+    return (
+        Scenario("login", "POST", "/login", lambda client, i: client.post(
+            "/login", data={"username": f"user{user()}", "password": PASSWORD}), 0.25),
+        Scenario("list_stocks", "GET", "/stocks/", lambda client, i: client.get("/stocks/")),
+        Scenario("get_stock", "GET", "/stocks/{ticker}", lambda client, i: client.get(f"/stocks/{ticker()}")),
+        Scenario("create_transaction", "POST", "/transactions", order),
+        Scenario("list_transactions", "GET", "/transactions/",
+                 lambda client, i: client.get("/transactions/", params={"limit": 100})),
+        Scenario("list_transactions_stream", "GET", "/transactions/",
+                 lambda client, i: client.get("/transactions/", params={"stream": "ndjson"}), 0.002),
+        Scenario("transactions_by_user", "GET", "/transactions/user/{username}",
+                 lambda client, i: client.get(f"/transactions/user/user{user()}")),
+        Scenario("transactions_by_date", "GET", "/transactions/{username}/by-date", by_date()),
+        Scenario("transactions_daily", "GET", "/transactions/{username}/by-date", by_date("daily")),
+    )
+
+
+async def query_totals(client: httpx.AsyncClient) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """(method, route) -> sum and count of the per-request SQL statement histogram."""
+    totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for line in (await client.get("/metrics")).text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, method, route, value = match.groups()
+            totals.setdefault((method, route), {"sum": 0.0, "count": 0.0})[kind] = float(value)
+    return totals
+
+
+async def run_scenarios(base_url: str, scenarios, args) -> Dict[str, Dict]:
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        for scenario in scenarios:
+            if args.only and scenario.name not in args.only:
+                continue
+            total = max(1, int(args.requests * scenario.share))
+            before = (await query_totals(client)).get((scenario.method, scenario.route), {"sum": 0, "count": 0})
+            result = await run_load(client, scenario.make_request, total, args.concurrency)
+            after = (await query_totals(client)).get((scenario.method, scenario.route), {"sum": 0, "count": 0})
+            requests = after["count"] - before["count"]
+            result["queries_per_request"] = round((after["sum"] - before["sum"]) / requests, 2) if requests else None
+            results[scenario.name] = result
+            print(f"{scenario.name:26s} {result['throughput_rps']:9.1f} rps  p50 {result['p50_ms']:8.2f} ms  "
+                  f"p99 {result['p99_ms']:8.2f} ms  {result['queries_per_request']} queries/req  "
+                  f"{result['errors']} errors")
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{temp_sqlite_path('bench_suite')}")
+    parser.add_argument("--app-dir", default=None)
+    parser.add_argument("--port", type=int, default=8771)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--stocks", type=int, default=200)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in the database")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario, before its share")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    from common.authentication import create_access_token, get_password_hash
+    from database.db import engine
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(engine, users=args.users, stocks=args.stocks, transactions=args.transactions, balance=1e12,
+             hashed_password=get_password_hash(PASSWORD))
+        print(f"seeded {args.users:,} users, {args.stocks:,} stocks, {args.transactions:,} transactions "
+              f"in {time.perf_counter() - started:.1f}s")
+    tokens = {i: create_access_token({"sub": f"user{i}", "uid": i}) for i in range(1, args.users + 1)}
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        env = {"BCRYPT_ROUNDS": str(args.bcrypt_rounds), "LOG_FILE": os.path.join(log_dir, "suite.log")}
+        with UvicornServer(args.database_url, port=args.port, app_dir=args.app_dir, env=env,
+                           stdout=subprocess.DEVNULL) as server:
+            results = asyncio.run(run_scenarios(server.base_url, build_scenarios(args, tokens), args))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "database": args.database_url.split("://", 1)[0],
+            **{key: getattr(args, key) for key in ("users", "stocks", "transactions", "requests", "concurrency")},
+        },
+        "scenarios": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
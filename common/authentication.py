@@ -1,9 +1,15 @@
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from typing import Dict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from config.config import settings
+from config.logger import user_var
 
 
 SECRET_KEY = "your_secret_key"
@@ -11,20 +17,77 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with fewer rounds than configured are flagged by verify_and_update and rehashed on login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS
+)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def create_access_token(data: Dict[str, str], expires_delta: timedelta = None):
-    """Create a JWT access token."""
+class Principal(NamedTuple):
+    """The authenticated caller, as carried by the access token."""
+    id: int
+    username: str
+
+
+class TokenDenyList:
+    """Revoked token ids (jti), each kept only until the token would have expired anyway."""
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+
+    def revoke(self, jti: str, expires_at: float):
+        now = time.time()
+        self._revoked = {key: exp for key, exp in self._revoked.items() if exp > now}
+        self._revoked[jti] = expires_at
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._revoked
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens, so each token's signature is checked once until it expires."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, Principal]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[Tuple[float, str, Principal]]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return entry
+
+    def put(self, token: str, expires_at: float, jti: str, principal: Principal):
+        self._entries[token] = (expires_at, jti, principal)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+token_deny_list = TokenDenyList()
+
+
+def create_access_token(data: Dict[str, Any], expires_delta: timedelta = None):
+    """Create a JWT access token with a unique id (jti) so it can be revoked."""
     if not isinstance(data, dict):
         raise ValueError("Data must be a dictionary.") 
 
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -40,14 +103,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Retrieve the current user from the token."""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+def verify_token(token: str) -> Tuple[float, str, Principal]:
+    """Decode and verify a token, returning its expiry, jti and principal; served from the cache when seen before."""
+    entry = token_cache.get(token)
+    if entry is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
         username: str = payload.get("sub")
-        if username is None:
+        user_id = payload.get("uid")
+        if username is None or user_id is None:
             raise HTTPException(status_code=401, detail="Could not validate credentials")
-        return username
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
+        entry = (float(payload["exp"]), payload.get("jti", ""), Principal(id=int(user_id), username=username))
+        token_cache.put(token, *entry)
+    if entry[1] in token_deny_list:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return entry
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Retrieve the current user from the token and tag the request's log lines with it."""
+    principal = verify_token(token)[2]
+    user_var.set(principal.username)
+    return principal
+
 
+def revoke_token(token: str):
+    """Add the token's jti to the deny list until the token expires."""
+    expires_at, jti, _ = verify_token(token)
+    token_deny_list.revoke(jti, expires_at)
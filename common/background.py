@@ -0,0 +1,43 @@
+import asyncio
+from typing import Optional
+
+from config.logger import logger
+
+
+class PeriodicFlusher:
+    """
+    Base class for in-memory buffers that a background task flushes once per window.
+    Subclasses implement flush(); start() and stop() are called from the app lifespan.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+
+    async def flush(self) -> int:
+        raise NotImplementedError
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                # shielded so stop() lets an in-flight flush finish instead of cutting it short
+                self._flushing = asyncio.ensure_future(self.flush())
+                await asyncio.shield(self._flushing)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Periodic flush of %s failed", type(self).__name__)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flushing is not None and not self._flushing.done():
+            await asyncio.wait([self._flushing])
+        await self.flush()
@@ -0,0 +1,58 @@
+import json
+from typing import Dict, Tuple
+
+from config.config import settings
+
+
+class LoadShedder:
+    """
+    Counts the HTTP requests a worker is serving. Past `max_in_flight` new ones are
+    refused at once rather than queued behind the database pool or the event loop,
+    so the requests already admitted keep their latency. 0 admits everything.
+    """
+
+    def __init__(self, max_in_flight: int, retry_after: int, exempt_prefixes: Tuple[str, ...] = ()):
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.exempt_prefixes = exempt_prefixes
+        self.in_flight = 0
+        self.shed = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "shed": self.shed}
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware answering 503 with Retry-After for requests the shedder refuses."""
+
+    def __init__(self, app, shedder: LoadShedder):
+        self.app = app
+        self.shedder = shedder
+
+    async def __call__(self, scope, receive, send):
+        shedder = self.shedder
+        if scope["type"] != "http" or not shedder.max_in_flight or scope["path"].startswith(shedder.exempt_prefixes):
+            return await self.app(scope, receive, send)
+
+        if shedder.in_flight >= shedder.max_in_flight:
+            shedder.shed += 1
+            body = json.dumps({"detail": "Server overloaded, retry later"}).encode()
+            await send({"type": "http.response.start", "status": 503, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(shedder.retry_after).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        shedder.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shedder.in_flight -= 1
+
+
+# Only short requests are counted: the metrics scrape and the long-lived price streams,
+# outgoing SSE and incoming NDJSON ticks, are exempt, and WebSocket scopes are never HTTP.
+load_shedder = LoadShedder(settings.MAX_IN_FLIGHT_REQUESTS, settings.SHED_RETRY_AFTER,
+                           ("/metrics", "/sse/", "/stocks/prices/stream"))
@@ -0,0 +1,192 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from common.load_shedding import load_shedder
+from common.rate_limit import rate_limiter
+from config.config import settings
+from config.logger import logger
+from database.db import async_engine, replica_engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, values)) + "}"
+
+
+class Histogram:
+    """A Prometheus histogram with a fixed set of label names, kept in process memory."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # label values -> [count per bucket, the last one +Inf; sum of observations]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = format_labels((*self.labelnames, "le"), (*labels, bound))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency by route.",
+                            ("method", "route", "status"))
+REQUEST_QUERIES = Histogram("http_request_db_queries", "SQL statements executed per request.",
+                            ("method", "route"), QUERY_COUNT_BUCKETS)
+REQUEST_QUERY_SECONDS = Histogram("http_request_db_seconds", "Time spent in SQL statements per request.",
+                                  ("method", "route"))
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "Latency of single SQL statements.")
+
+
+class QueryStats:
+    """SQL statements run on behalf of one request; per-statement totals only when slow-request logging is on."""
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self, by_statement: bool):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Optional[Dict[str, list]] = defaultdict(lambda: [0, 0.0]) if by_statement else None
+
+    def add(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        if self.statements is not None:
+            totals = self.statements[" ".join(statement.split())[:200]]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def breakdown(self, limit: int = 10) -> List[Dict]:
+        """The statements that took longest in total, with how often each ran."""
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [{"sql": sql, "count": count, "ms": round(seconds * 1000, 2)} for sql, (count, seconds) in ranked]
+
+
+query_stats_var: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Time every statement the engine runs and charge it to the current request, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        QUERY_SECONDS.observe((), elapsed)
+        stats = query_stats_var.get()
+        if stats is not None:
+            stats.add(statement, elapsed)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records latency, SQL statement count and SQL time of each HTTP
+    request under its route template, so /stocks/T1 and /stocks/T2 share one series.
+    Requests slower than SLOW_REQUEST_MS (0 disables it) are logged with their slowest statements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats(by_statement=settings.SLOW_REQUEST_MS > 0)
+        token = query_stats_var.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            query_stats_var.reset(token)
+            method = scope["method"]
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe((method, route, str(status)), elapsed)
+            REQUEST_QUERIES.observe((method, route), stats.count)
+            REQUEST_QUERY_SECONDS.observe((method, route), stats.seconds)
+            if settings.SLOW_REQUEST_MS > 0 and elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+                logger.warning(
+                    "Slow request %s %s: %.1f ms, %d queries in %.1f ms", method, route, elapsed * 1000,
+                    stats.count, stats.seconds * 1000, extra={"queries": stats.breakdown()}
+                )
+
+
+def pool_gauges(engine) -> List[str]:
+    """Connection pool occupancy; pools without a fixed size (SQLite's) report nothing."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return []
+    lines = []
+    for name, documentation, value in (
+        ("db_pool_size", "Configured pool size.", pool.size()),
+        ("db_pool_checked_out", "Connections in use.", pool.checkedout()),
+        ("db_pool_checked_in", "Idle connections in the pool.", pool.checkedin()),
+        ("db_pool_overflow", "Connections open beyond the pool size.", pool.overflow()),
+    ):
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return lines
+
+
+def overload_metrics() -> List[str]:
+    """Requests in flight, shed with 503 and refused with 429 by this worker."""
+    lines = []
+    for name, kind, documentation, value in (
+        ("http_requests_in_flight", "gauge", "HTTP requests being served.", load_shedder.in_flight),
+        ("http_requests_shed_total", "counter", "Requests refused with 503 by the load shedder.", load_shedder.shed),
+        ("http_requests_rate_limited_total", "counter", "Requests refused with 429 by the rate limits.",
+         rate_limiter.limited),
+    ):
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return lines
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of this worker's metrics."""
+    lines = []
+    for histogram in (REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_QUERY_SECONDS, QUERY_SECONDS):
+        lines += histogram.render()
+    lines += pool_gauges(async_engine)
+    lines += overload_metrics()
+    return "\n".join(lines) + "\n"
+
+
+instrument_engine(async_engine.sync_engine)
+if replica_engine is not async_engine:
+    instrument_engine(replica_engine.sync_engine)
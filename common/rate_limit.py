@@ -0,0 +1,150 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request
+
+from common.authentication import Principal, get_current_user
+from config.config import settings
+
+
+class Limit(NamedTuple):
+    rate: float  # tokens added per second
+    burst: float  # bucket capacity
+
+
+def parse_limit(spec: str) -> Optional[Limit]:
+    """"<requests>/<seconds>" as a bucket of `requests` tokens refilled over `seconds`; empty means no limit."""
+    if not spec.strip():
+        return None
+    requests, seconds = spec.split("/")
+    return Limit(float(requests) / float(seconds), float(requests))
+
+
+class LocalBucketStore:
+    """
+    Token buckets of this process, least recently used dropped past `max_entries`
+    (a dropped bucket comes back full). `clock` may be swapped for a fake one.
+    """
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        """Take a token; returns 0 when one was available, else the seconds until there is one."""
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [limit.burst, now]
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / limit.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Refill and take in one round trip, on Redis' clock so workers on different hosts agree.
+TAKE_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = burst
+if bucket[1] then
+    tokens = math.min(burst, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+end
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, shared by every uvicorn worker."""
+
+    def __init__(self, url: str, prefix: str = "rate-limit:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, limit: Limit) -> float:
+        return float(await self._take(keys=[self.prefix + key], args=[limit.rate, limit.burst]))
+
+    def __len__(self):
+        return 0
+
+
+class RateLimiter:
+    """Answers 429 with Retry-After once a key has used up its bucket."""
+
+    def __init__(self, store):
+        self.store = store
+        self.limited = 0
+
+    async def check(self, name: str, key, limit: Limit):
+        wait = await self.store.take(f"{name}:{key}", limit)
+        if wait > 0:
+            self.limited += 1
+            raise HTTPException(status_code=429, detail="Too many requests",
+                                headers={"Retry-After": str(math.ceil(wait))})
+
+    def stats(self) -> Dict[str, int]:
+        return {"limited": self.limited, "buckets": len(self.store)}
+
+
+def build_store():
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisBucketStore(settings.RATE_LIMIT_REDIS_URL)
+    return LocalBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limiter = RateLimiter(build_store())
+
+
+async def _unlimited():
+    pass
+
+
+def limit_per_user(name: str, limit: Optional[Limit]):
+    """Route dependency limiting the authenticated caller; reuses the route's get_current_user."""
+    if limit is None:
+        return _unlimited
+
+    async def dependency(current_user: Principal = Depends(get_current_user)):
+        await rate_limiter.check(name, current_user.id, limit)
+
+    return dependency
+
+
+def limit_per_client(name: str, limit: Optional[Limit]):
+    """
+    Route dependency limiting the client address, for endpoints called before login.
+    Behind a proxy run uvicorn with --proxy-headers so this is the real client.
+    """
+    if limit is None:
+        return _unlimited
+
+    async def dependency(request: Request):
+        await rate_limiter.check(name, request.client.host if request.client else "", limit)
+
+    return dependency
+
+
+order_rate_limit = limit_per_user("orders", parse_limit(settings.RATE_LIMIT_ORDERS))
+login_rate_limit = limit_per_client("login", parse_limit(settings.RATE_LIMIT_LOGIN))
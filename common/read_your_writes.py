@@ -0,0 +1,36 @@
+import math
+import time
+
+from config.config import settings
+from database.db import PRIMARY_UNTIL_COOKIE, async_engine, primary_commit_var, replica_engine
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware that notes whether a request committed on the primary and, if so,
+    sets a cookie sending the client's reads to the primary for READ_YOUR_WRITES_SECONDS,
+    long enough for the replica to catch up. Does nothing without a replica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or replica_engine is async_engine:
+            return await self.app(scope, receive, send)
+
+        committed = [False]
+        token = primary_commit_var.set(committed)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and committed[0]:
+                seconds = settings.READ_YOUR_WRITES_SECONDS
+                cookie = (f"{PRIMARY_UNTIL_COOKIE}={time.time() + seconds:.3f}; Max-Age={max(1, math.ceil(seconds))}; "
+                          f"Path=/; HttpOnly; SameSite=Lax")
+                message["headers"] = [*message.get("headers", ()), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            primary_commit_var.reset(token)
@@ -0,0 +1,51 @@
+import logging
+import time
+import uuid
+
+from config.logger import logger, request_id_var, sampled_var, should_sample, user_var
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware that gives each HTTP request an id (the client's X-Request-ID or a
+    new one), echoes it in the response, and logs one access line with status and latency.
+
+    It wraps the app directly rather than through BaseHTTPMiddleware, so endpoints and
+    their dependencies run in this context and see the request's context variables.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = ""
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        tokens = (request_id_var.set(request_id), user_var.set(""), sampled_var.set(should_sample()))
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            logger.log(
+                logging.ERROR if status >= 500 else logging.INFO, "%s %s %d", scope["method"], scope["path"], status,
+                extra={"method": scope["method"], "path": scope["path"], "status": status, "latency_ms": latency_ms}
+            )
+            for var, token in zip((request_id_var, user_var, sampled_var), tokens):
+                var.reset(token)
+
@@ -0,0 +1,49 @@
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from services.response_cache import CachedResponse
+
+
+class FastJSONResponse(Response):
+    """
+    JSON encoded by orjson straight from dicts, lists and datetimes. Returning it from
+    an endpoint skips FastAPI's response_model validation, so callers must already
+    hold data in the response model's shape. UTC datetimes end in "Z" like Pydantic's.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        import orjson
+
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def conditional_response(request: Request, cached: CachedResponse, cache_control: str) -> Response:
+    """
+    The cached body, or 304 Not Modified when the client's If-None-Match names its ETag
+    or, without If-None-Match, its If-Modified-Since is not before its Last-Modified.
+    """
+    headers = {"ETag": cached.etag, "Last-Modified": cached.last_modified, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # weak comparison: W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or cached.etag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since(request) >= cached.modified_second:
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+
+def if_modified_since(request: Request) -> float:
+    value = request.headers.get("if-modified-since")
+    if not value:
+        return -1
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return -1
@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, func, type_coerce
+
+# date_trunc field -> the equivalent SQLite strftime format, in SQLAlchemy's storage format
+TRUNCATE_FORMATS = {
+    "hour": "%Y-%m-%d %H:00:00.000000",
+    "day": "%Y-%m-%d 00:00:00.000000",
+}
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_naive_utc(moment: datetime) -> datetime:
+    """
+    Convert an aware datetime to naive UTC, the form timestamps are stored and compared in
+    (PostgreSQL sessions are pinned to UTC, so naive bounds compare as UTC there too).
+    """
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def as_aware_utc(moment: datetime) -> datetime:
+    """Attach UTC to a naive datetime read back from SQLite, where timestamps are stored in UTC."""
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def truncate_timestamp(dialect: str, column, field: str):
+    """SQL expression truncating a timestamp column to the naive UTC start of its hour or day."""
+    if dialect == "postgresql":
+        return func.date_trunc(field, func.timezone("UTC", column))
+    # SQLite keeps timestamps as text; coerce so the result comes back as a datetime
+    return type_coerce(func.strftime(TRUNCATE_FORMATS[field], column), DateTime)
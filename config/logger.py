@@ -1,23 +1,119 @@
+import atexit
+import contextvars
+import json
 import logging
+import queue
+import random
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-logger = logging.getLogger()
+from config.config import settings
+
+# Set per request by common.request_logging and get_current_user, and stamped on every
+# record logged while the request runs.
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="")
+user_var: contextvars.ContextVar[str] = contextvars.ContextVar("user", default="")
+# Whether INFO lines of the current request are kept; decided once per request.
+sampled_var: contextvars.ContextVar[bool] = contextvars.ContextVar("sampled", default=True)
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is logged as a field.
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request context and any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamp the request id and user on the record and apply INFO sampling. Runs on the
+    calling task, before the record is queued, so the context variables are the request's.
+    """
 
-# create formatter
-formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id:
+            record.request_id = request_id
+            user = user_var.get()
+            if user:
+                record.user = user
+        return record.levelno != logging.INFO or sampled_var.get()
 
-# create handler
-stream_handler = logging.StreamHandler(sys.stdout)
-file_handler = logging.FileHandler('stock.log')
 
-# set formatter
-stream_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
+class NonBlockingQueueHandler(QueueHandler):
+    """Drops records instead of blocking when the writer falls behind and the queue is full."""
 
-# add logger to handler
-logger.handlers = [stream_handler, file_handler]
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
 
-# set log level
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Format the message and traceback now, but leave the layout to the writer's formatter.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-logger.setLevel(logging.INFO)
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def should_sample() -> bool:
+    """Decide whether a new request's INFO lines are logged, at LOG_INFO_SAMPLE_RATE."""
+    rate = settings.LOG_INFO_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
+
+
+def build_handlers():
+    if settings.LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        handlers.append(RotatingFileHandler(settings.LOG_FILE, maxBytes=settings.LOG_MAX_BYTES,
+                                            backupCount=settings.LOG_BACKUP_COUNT))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+logger = logging.getLogger()
+logger.setLevel(settings.LOG_LEVEL)
 
+# Records go on a queue and a background thread does the stdout and file writes,
+# so logging from a request never blocks the event loop on I/O.
+handlers = build_handlers()
+if settings.LOG_QUEUE_SIZE > 0:
+    queue_handler = NonBlockingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(ContextFilter())
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.handlers = [queue_handler]
+else:
+    for handler in handlers:
+        handler.addFilter(ContextFilter())
+    logger.handlers = handlers
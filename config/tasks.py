@@ -1,23 +1,66 @@
 # tasks.py
 from celery import Celery
-from time import sleep
 import logging
 
-logger = logging.getLogger(__name__)
+from config.config import settings
 
-CELERY_BROKER_URL = "redis://localhost:6380/0"
-CELERY_RESULT_BACKEND = "redis://localhost:6380/1"
+logger = logging.getLogger(__name__)
 
 celery = Celery(
     "config",
-    broker=CELERY_BROKER_URL,
-    backend=CELERY_RESULT_BACKEND
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND
 )
 
-@celery.task
+celery.conf.task_always_eager = settings.CELERY_TASK_ALWAYS_EAGER
+# Fail fast instead of blocking the outbox relay while the broker is unreachable.
+celery.conf.broker_connection_timeout = settings.OUTBOX_PUBLISH_TIMEOUT
+celery.conf.broker_connection_retry_on_startup = False
+
+celery.conf.beat_schedule = {
+    "reconcile-stock-stats": {
+        "task": "config.tasks.reconcile_stock_stats",
+        "schedule": settings.STOCK_STATS_RECONCILE_INTERVAL,
+    },
+    "purge-idempotency-keys": {
+        "task": "config.tasks.purge_idempotency_keys",
+        "schedule": settings.IDEMPOTENCY_PURGE_INTERVAL,
+    },
+}
+
+@celery.task(ignore_result=True)
+def notify_new_stocks(events: list):
+    """Send the notifications of a batch of created stocks, one task invocation per batch."""
+    for event in events:
+        logger.info("New stock created: ticker=%r, name=%r, price=%s",
+                    event["ticker"], event["stock_name"], event["stock_price"])
+    logger.info("Notifications for %d stocks sent successfully.", len(events))
+    return len(events)
+
+
+@celery.task(ignore_result=True)
 def notify_new_stock(ticker: str, stock_name: str, stock_price: float):
-    """Simulate sending a notification when a new book is created."""
-    logger.info(f"New book created: ticker='{ticker}', name='{stock_name}',price={stock_price} ")
-    # Simulate a delay for the notification process
-    sleep(2)
-    logger.info(f"Notification for stock '{ticker}' sent successfully.")
+    """Single-event form, kept for messages queued before the batched task existed."""
+    return notify_new_stocks([{"ticker": ticker, "stock_name": stock_name, "stock_price": stock_price}])
+
+
+@celery.task
+def reconcile_stock_stats():
+    """Rebuild the stock_stats summary from the transactions table."""
+    from database.db import engine
+    from services.stock_stats import reconcile_stock_stats as reconcile
+
+    with engine.begin() as conn:
+        reconcile(conn)
+    logger.info("Reconciled stock stats")
+
+
+@celery.task
+def purge_idempotency_keys():
+    """Delete idempotency keys past their TTL."""
+    from database.db import engine
+    from services.idempotency import purge_expired_keys
+
+    with engine.begin() as conn:
+        purged = purge_expired_keys(conn)
+    logger.info("Purged %d expired idempotency keys", purged)
@@ -1,25 +1,140 @@
-from sqlalchemy import create_engine
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
 from config.config import settings
 from sqlalchemy.orm import sessionmaker
 SQLALCHEMY_DATABASE_URL = settings.SQLALCHEMY_DATABASE_URL
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_SQLALCHEMY_DATABASE_URL
+
+# Holds until this epoch time the client reads from the primary; see ReadYourWritesMiddleware.
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+def engine_options(url: str) -> dict:
+    """Pool sizing for server databases; SQLite picks its own pool and needs a busy timeout instead."""
+    if url.startswith("sqlite"):
+        return {"connect_args": {"timeout": 30}}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    # Sessions run in UTC so the naive UTC bounds the routes bind (see as_naive_utc) compare
+    # against timestamptz columns as UTC whatever the server's TimeZone.
+    server_settings = {"timezone": "UTC"}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {"server_settings": server_settings}
+    elif url.startswith("postgresql"):
+        options["connect_args"] = {"options": " ".join(f"-c {name}={value}" for name, value in server_settings.items())}
+    return options
 
 
+# Synchronous engine, used by create_db, migrations and offline scripts.
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL
+    SQLALCHEMY_DATABASE_URL,
+    **engine_options(SQLALCHEMY_DATABASE_URL)
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine, used by every request handler so DB round trips don't block the event loop.
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    **engine_options(ASYNC_SQLALCHEMY_DATABASE_URL)
+)
+# Read replica for read-only endpoints; the primary itself when none is configured.
+replica_engine = create_async_engine(
+    settings.ASYNC_DATABASE_REPLICA_URL,
+    **engine_options(settings.ASYNC_DATABASE_REPLICA_URL)
+) if settings.ASYNC_DATABASE_REPLICA_URL else async_engine
+
+
+class RoutingSession(Session):
+    """
+    Sends the reads of a session opened with info={"read_only": True} to the replica.
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary, so a write
+    issued from a read-only endpoint by mistake cannot land on the replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("read_only") and not self._flushing and not isinstance(clause, UpdateBase):
+            return replica_engine.sync_engine
+        return async_engine.sync_engine
+
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, sync_session_class=RoutingSession,
+    autoflush=False, expire_on_commit=False
+)
+
+# Set to a one-element list for the duration of each request; True once a primary session commits.
+primary_commit_var: ContextVar[Optional[list]] = ContextVar("primary_commit", default=None)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def mark_primary_commit(session: Session):
+    committed = primary_commit_var.get()
+    if committed is not None and not session.info.get("read_only"):
+        committed[0] = True
+
+
 Base = declarative_base()
 
 
+def dialect_insert(db, table):
+    """INSERT construct of the session's dialect, so callers can use on_conflict_do_update upserts."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
 def create_db():
     Base.metadata.create_all(bind=engine)
 
 
-def get_db():
-    db = SessionLocal()  # Create a new database session
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:  # Create a new database session
         yield db  # Allow the session to be used in the endpoint
-    finally:
-        db.close()
+
+
+def reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only endpoints: the replica, unless this client committed a write
+    moments ago. Endpoints whose results land in a cache shared by every client use
+    get_db, or primary_reads, instead.
+    """
+    async with AsyncSessionLocal(info={"read_only": not reads_from_primary(request)}) as db:
+        yield db
+
+
+@asynccontextmanager
+async def primary_reads(db: AsyncSession):
+    """
+    `db`, or a primary session while `db` reads from the replica. For filling shared
+    caches: a replica lagging behind a write just invalidated would otherwise put the
+    old value back for every client until the entry expires.
+    """
+    if not db.info.get("read_only"):
+        yield db
+        return
+    async with AsyncSessionLocal() as primary:
+        yield primary
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer
+from database.db import Base
+
+
+class Holdings(Base):
+    """
+    A model representing a user's position in a stock, with running buy/sell totals
+    and the open position's cost basis, so average cost and realized P&L never need
+    the transaction history.
+    """
+
+    __tablename__ = 'holdings'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    stock_id = Column(Integer, ForeignKey('stocks.id'), primary_key=True)
+    quantity = Column(Float, nullable=False, default=0)
+    bought_volume = Column(Float, nullable=False, default=0)
+    bought_cost = Column(Float, nullable=False, default=0)
+    sold_volume = Column(Float, nullable=False, default=0)
+    sold_proceeds = Column(Float, nullable=False, default=0)
+    # Cost of the shares still owned (bought_volume - sold_volume, reserved ones included)
+    # at their average price; each sale takes its proportional share out of it.
+    cost_basis = Column(Float, nullable=False, default=0)
+    # Proceeds minus the cost basis taken out, summed as each sale happens.
+    realized_pnl = Column(Float, nullable=False, default=0)
+
+    class Config:
+        from_attributes = True
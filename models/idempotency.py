@@ -0,0 +1,31 @@
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+from database.db import Base
+
+
+class IdempotencyKey(Base):
+    """
+    A model representing the outcome of a request sent with an Idempotency-Key,
+    committed together with the transaction it created so a retry can be answered
+    with the stored response instead of executing the order again.
+    """
+
+    __tablename__ = 'idempotency_keys'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # sha256 of the request body; a key reused for a different request is rejected
+    fingerprint = Column(String(64), nullable=False)
+    transaction_id = Column(Integer, ForeignKey('transactions.id'), nullable=True)
+    status_code = Column(Integer, nullable=False)
+    response = Column(JSON, nullable=False)
+    created_time = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # purge of expired keys
+        Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+from database.db import Base
+
+
+class Order(Base):
+    """
+    A model representing a limit order. Open orders rest in the in-memory order book
+    and are reloaded from this table on startup; the id gives time priority.
+    """
+
+    __tablename__ = 'orders'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    stock_id = Column(Integer, ForeignKey('stocks.id'), nullable=False)
+    side = Column(String(4), nullable=False)
+    price = Column(Float, nullable=False)
+    volume = Column(Float, nullable=False)
+    remaining = Column(Float, nullable=False)
+    status = Column(String(9), nullable=False, default='open')
+    created_time = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # recovery of the open orders on startup
+        Index('ix_orders_status_stock_id', 'status', 'stock_id'),
+        Index('ix_orders_user_id_created_time', 'user_id', 'created_time'),
+    )
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,21 @@
+from sqlalchemy import JSON, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from database.db import Base
+
+
+class OutboxEvent(Base):
+    """
+    A model representing an event written in the same DB transaction as the change
+    it describes, waiting for the outbox relay to hand it to Celery. Rows are
+    deleted once dispatched.
+    """
+
+    __tablename__ = 'outbox_events'
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_time = Column(DateTime(timezone=True), server_default=func.now())
+
+    class Config:
+        from_attributes = True
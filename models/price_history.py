@@ -0,0 +1,45 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from database.db import Base
+
+
+class PriceTick(Base):
+    """
+    A model representing one recorded price of a stock: a price update, or a trade
+    when volume is non-zero. Append-only.
+    """
+
+    __tablename__ = 'price_ticks'
+
+    id = Column(Integer, primary_key=True)
+    stock_id = Column(Integer, ForeignKey('stocks.id'), nullable=False)
+    price = Column(Float, nullable=False)
+    volume = Column(Float, nullable=False, default=0)
+    created_time = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_price_ticks_stock_id_created_time', 'stock_id', 'created_time'),
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class PriceBar(Base):
+    """
+    A model representing one precomputed OHLCV bar of a stock at a given interval.
+    bucket_start is the UTC start of the bar.
+    """
+
+    __tablename__ = 'price_bars'
+
+    stock_id = Column(Integer, ForeignKey('stocks.id'), primary_key=True)
+    interval = Column(String(3), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Float, nullable=False, default=0)
+
+    class Config:
+        from_attributes = True
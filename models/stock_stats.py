@@ -0,0 +1,50 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from database.db import Base
+
+
+class StockStatsHourly(Base):
+    """
+    A model representing the trades of a stock within one UTC hour: the rollup the
+    rolling windows of StockStats are summed from.
+    """
+
+    __tablename__ = 'stock_stats_hourly'
+
+    stock_id = Column(Integer, ForeignKey('stocks.id'), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    trades = Column(Integer, nullable=False, default=0)
+    volume = Column(Float, nullable=False, default=0)
+    notional = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        # pruning of expired buckets
+        Index('ix_stock_stats_hourly_bucket_start', 'bucket_start'),
+    )
+
+    class Config:
+        from_attributes = True
+
+
+class StockStats(Base):
+    """
+    A model representing the trading totals of a stock over one rolling window
+    ("24h", "7d", "30d") or over all time ("all").
+    """
+
+    __tablename__ = 'stock_stats'
+
+    stock_id = Column(Integer, ForeignKey('stocks.id'), primary_key=True)
+    window = Column(String(3), primary_key=True)
+    trades = Column(Integer, nullable=False, default=0)
+    volume = Column(Float, nullable=False, default=0)
+    notional = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        # leaderboards: descending index scans within one window
+        Index('ix_stock_stats_window_volume', 'window', 'volume'),
+        Index('ix_stock_stats_window_notional', 'window', 'notional'),
+        Index('ix_stock_stats_window_trades', 'window', 'trades'),
+    )
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, ForeignKey, String, Float, DateTime, Integer
+from sqlalchemy import Column, ForeignKey, String, Float, DateTime, Index, Integer
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from common.timeutils import utcnow
 from database.db import Base
 
 class Transaction(Base):
@@ -16,11 +17,24 @@ class Transaction(Base):
     transaction_type = Column(String(4), nullable=False, default='BUY')
     transaction_volume = Column(Float, nullable=False)
     transaction_price = Column(Float, nullable=False)
-    created_time = Column(DateTime(timezone=True), server_default=func.now())
+    # The limit order a fill's BUY or SELL row settles; NULL for market orders.
+    order_id = Column(Integer, ForeignKey('orders.id'))
+    # Stamped by SQLAlchemy so SQLite stores the same text form cursors and range bounds
+    # bind as; the server default only covers rows inserted outside the ORM.
+    created_time = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
 
     user = relationship("Users")
     ticker = relationship("Stocks")
 
+    __table_args__ = (
+        # per-user history and by-date ranges
+        Index('ix_transactions_user_id_created_time', 'user_id', 'created_time'),
+        # per-stock ranges
+        Index('ix_transactions_ticker_id_created_time', 'ticker_id', 'created_time'),
+        # keyset pagination of the full listing
+        Index('ix_transactions_created_time_id', 'created_time', 'id'),
+    )
+
     class Config:
         from_attributes = True
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from typing import Dict, Iterable, List, Tuple
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from config.logger import logger
+from database.db import AsyncSessionLocal
+from services.price_feed import PRICE, price_feed
+from services.stock_cache import stock_cache
+
+market_data_router = APIRouter()
+
+# Seconds between SSE keep-alive comments on a quiet stream.
+SSE_HEARTBEAT = 15
+
+
+def parse_tickers(tickers: str) -> List[str]:
+    return [ticker for ticker in tickers.split(",") if ticker]
+
+
+async def resolve_tickers(tickers: Iterable[str]) -> Dict[int, Dict]:
+    """Map the known tickers to their stock id; unknown tickers are left out."""
+    async with AsyncSessionLocal() as db:
+        stocks = await stock_cache.get_many(db, tickers)
+    return {stock["id"]: stock for stock in stocks.values()}
+
+
+def to_message(event: Dict, tickers: Dict[int, str]) -> Dict:
+    return {
+        "type": event["type"],
+        "ticker": tickers.get(event["stock_id"]),
+        "price": event["price"],
+        "volume": event["volume"],
+        "time": event["time"],
+    }
+
+
+def snapshot(stocks: Dict[int, Dict]) -> List[Dict]:
+    """Current price of every newly subscribed stock, so clients never need a first poll."""
+    return [{"type": PRICE, "ticker": stock["ticker"], "price": stock["stock_price"], "volume": 0.0, "time": None}
+            for stock in stocks.values()]
+
+
+SUBSCRIPTION_ERROR = 'Expected {"subscribe": [tickers]} and/or {"unsubscribe": [tickers]}'
+
+
+def parse_subscription(text: str) -> Tuple[List[str], List[str]]:
+    """Tickers to add and to drop from a subscription message; ValueError if malformed."""
+    message = json.loads(text)
+    subscribe, unsubscribe = message.get("subscribe", []), message.get("unsubscribe", [])
+    for tickers in (subscribe, unsubscribe):
+        if not isinstance(tickers, list) or not all(isinstance(ticker, str) for ticker in tickers):
+            raise ValueError("tickers must be a list of strings")
+    return subscribe, unsubscribe
+
+
+@market_data_router.websocket("/ws/prices")
+async def price_socket(websocket: WebSocket, tickers: str = ""):
+    """
+    Pushes price and trade updates of the subscribed tickers as JSON arrays of events.
+
+    Subscribe with the `tickers` query parameter (comma-separated) and change the
+    subscription later by sending {"subscribe": [...]} or {"unsubscribe": [...]};
+    malformed messages are answered with an {"error": ...} frame.
+    """
+    await websocket.accept()
+    stocks = await resolve_tickers(parse_tickers(tickers))
+    names = {stock_id: stock["ticker"] for stock_id, stock in stocks.items()}
+    subscriber = price_feed.subscribe(names)
+
+    async def receive():
+        while True:
+            try:
+                subscribe, unsubscribe = parse_subscription(await websocket.receive_text())
+            except (ValueError, AttributeError):
+                await websocket.send_text(json.dumps({"error": SUBSCRIPTION_ERROR}))
+                continue
+            added = await resolve_tickers(subscribe)
+            removed = [stock_id for stock_id, ticker in names.items() if ticker in unsubscribe]
+            for stock_id in removed:
+                del names[stock_id]
+            names.update({stock_id: stock["ticker"] for stock_id, stock in added.items()})
+            price_feed.update(subscriber, add=added, remove=removed)
+            if added:
+                await websocket.send_text(json.dumps(snapshot(added)))
+
+    async def send():
+        if stocks:
+            await websocket.send_text(json.dumps(snapshot(stocks)))
+        while True:
+            events = await subscriber.get()
+            await websocket.send_text(json.dumps([to_message(event, names) for event in events]))
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning("Price socket closed: %r", error)
+    finally:
+        for task in tasks:
+            task.cancel()
+        price_feed.unsubscribe(subscriber)
+
+
+@market_data_router.get("/sse/prices")
+async def price_events(request: Request, tickers: str):
+    """
+    Server-sent events stream of price and trade updates of the given tickers
+    (comma-separated). Each event's data is one JSON update.
+    """
+    stocks = await resolve_tickers(parse_tickers(tickers))
+    if not stocks:
+        raise HTTPException(status_code=404, detail="Stock not found")
+    names = {stock_id: stock["ticker"] for stock_id, stock in stocks.items()}
+
+    async def stream():
+        subscriber = price_feed.subscribe(names)
+        try:
+            for message in snapshot(stocks):
+                yield f"data: {json.dumps(message)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    events = await asyncio.wait_for(subscriber.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in events:
+                    yield f"data: {json.dumps(to_message(event, names))}\n\n"
+        finally:
+            price_feed.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@market_data_router.get("/ws/prices/stats")
+async def price_feed_stats():
+    """Subscriber and delivery counters of the price feed hub."""
+    return price_feed.stats()
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.authentication import Principal, get_current_user
+from common.rate_limit import order_rate_limit
+from config.logger import logger
+from database.db import get_db
+from models.stock import Stocks
+from schemas.order_schema import OrderBookSnapshot, OrderCreate, OrderResponse
+from services.limit_orders import cancel_limit_order, place_limit_order
+from services.order_book import order_books
+from services.order_execution import normalize_side
+from services.stock_cache import stock_cache
+
+order_router = APIRouter()
+
+
+@order_router.post("/orders", response_model=OrderResponse, status_code=status.HTTP_201_CREATED,
+                   dependencies=[Depends(order_rate_limit)])
+async def create_order(
+        order: OrderCreate,
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user)
+):
+    """
+    Places a limit order for the current user. It is matched against the stock's
+    order book at once; any unfilled volume rests in the book until filled or cancelled.
+    """
+    logger.info("Placing limit order")
+    if order.volume <= 0:
+        raise HTTPException(status_code=400, detail="Volume must be greater than 0")
+    if order.price <= 0:
+        raise HTTPException(status_code=400, detail="Price must be greater than 0")
+    side = normalize_side(order.side)
+
+    stock = await stock_cache.get(db, order.ticker)
+    if not stock:
+        raise HTTPException(status_code=404, detail="Stock not found")
+
+    placed, fills = await place_limit_order(db, current_user.id, stock["id"], side, order.price, order.volume)
+    return {
+        **placed,
+        "ticker": stock["ticker"],
+        "fills": [
+            {"price": fill.price, "volume": fill.volume, "counterparty_order_id": fill.resting.id}
+            for fill in fills
+        ],
+    }
+
+
+@order_router.delete("/orders/{order_id}", response_model=OrderResponse, dependencies=[Depends(order_rate_limit)])
+async def cancel_order(
+        order_id: int,
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user)
+):
+    """Cancels an open order of the current user and releases its reserved cash or shares."""
+    logger.info("Cancelling order %d", order_id)
+    order = await cancel_limit_order(db, order_id, current_user.id)
+    ticker = (await db.execute(select(Stocks.ticker).where(Stocks.id == order.stock_id))).scalar()
+    return {
+        "id": order.id,
+        "ticker": ticker,
+        "side": order.side,
+        "price": order.price,
+        "volume": order.volume,
+        "remaining": order.remaining,
+        "status": order.status,
+        "created_time": order.created_time,
+    }
+
+
+@order_router.get("/orders/book/{ticker}", response_model=OrderBookSnapshot)
+async def get_order_book(
+        ticker: str,
+        depth: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)
+):
+    """Top of book and aggregated volume of the best `depth` price levels on each side."""
+    stock = await stock_cache.get(db, ticker)
+    if not stock:
+        raise HTTPException(status_code=404, detail="Stock not found")
+    book = order_books.get(stock["id"])
+    return {"ticker": stock["ticker"], "best_bid": book.best_bid(), "best_ask": book.best_ask(), **book.depth(depth)}
@@ -1,48 +1,237 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from common.authentication import get_current_user
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.authentication import Principal, get_current_user
+from common.responses import conditional_response
+from common.timeutils import as_naive_utc
+from config.config import settings
 from config.logger import logger
-from config.tasks import notify_new_stock
+from models.price_history import PriceBar
 from models.stock import Stocks
-from schemas.stock_schema import StockCreate, StockResponse
+from schemas.stock_schema import (PriceBarResponse, PriceTick, PriceUpdateResponse, StockCreate,
+                                  StockLeaderboardEntry, StockResponse, StockStatsResponse)
 from database.db import get_db
+from services.price_history import INTERVALS
+from services.outbox import STOCK_CREATED, add_event
+from services.response_cache import STOCKS_TAG, response_cache, stock_tag
+from services.stock_cache import stock_cache
+from services.stock_stats import RANKINGS, WINDOWS, get_stock_stats, top_stocks
+from services.tick_ingestion import tick_coalescer, write_prices
 
 router = APIRouter()
 
+STOCK_LIST = TypeAdapter(list[StockResponse])
+
+
+def stock_cache_control() -> str:
+    return f"public, max-age={settings.HTTP_CACHE_MAX_AGE}"
+
 @router.post("/stocks/", response_model=StockResponse)
-def create_stock(stock: StockCreate, db: Session = Depends(get_db), current_user: str = Depends(get_current_user)):
+async def create_stock(stock: StockCreate, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
 
 
-    existing_stock = db.query(Stocks).filter(Stocks.ticker == stock.ticker).first()
+    existing_stock = await stock_cache.get(db, stock.ticker)
     if existing_stock:
         raise HTTPException(status_code=400, detail="Stock with this ticker already exists")
 
     if stock.stock_price <= 0:
         raise HTTPException(status_code=400, detail="Price must be greater than 0")
-    logger.info(f"creating new stock {stock.ticker}")
+    logger.info("creating new stock %s", stock.ticker)
     db_stock = Stocks(
         ticker=stock.ticker,
         stock_name=stock.stock_name,
         stock_price=stock.stock_price
     )
 
-    notify_new_stock.delay(stock.ticker, stock.stock_name, stock.stock_price)
     db.add(db_stock)
-    db.commit()
-    db.refresh(db_stock)
+    # The notification is committed with the stock and sent to Celery by the outbox relay
+    add_event(db, STOCK_CREATED, {
+        "ticker": stock.ticker, "stock_name": stock.stock_name, "stock_price": stock.stock_price
+    })
+    await db.commit()
+    await db.refresh(db_stock)
+    await stock_cache.invalidate(db_stock.ticker)
     return db_stock
 
 
 @router.get("/stocks/", response_model=list[StockResponse])
-def list_stocks(db: Session = Depends(get_db)):
-    logger.info(f"Listing all the stocks ")
-    stocks = db.query(Stocks).all()
-    return stocks
+async def list_stocks(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Lists all stocks. The encoded listing is served from the response cache, and a
+    request whose If-None-Match still matches gets 304 without touching the database.
+    Misses read the primary, since every client is then served what they load.
+    """
+    logger.info("Listing all the stocks")
+    cached = response_cache.get(STOCKS_TAG)
+    if cached is None:
+        since = response_cache.version
+        stocks = STOCK_LIST.validate_python(await stock_cache.get_all(db))
+        cached = response_cache.put(STOCKS_TAG, STOCK_LIST.dump_json(stocks), [STOCKS_TAG], since)
+    return conditional_response(request, cached, stock_cache_control())
+
+
+@router.put("/stocks/prices", response_model=PriceUpdateResponse)
+async def update_prices(ticks: list[PriceTick], db: AsyncSession = Depends(get_db),
+                        current_user: Principal = Depends(get_current_user)):
+    """
+    Bulk price update: keeps the last price per ticker and writes them with one batched UPDATE.
+    """
+    logger.info("Updating prices of %d ticks", len(ticks))
+    updated = await write_prices(db, {tick.ticker: tick.stock_price for tick in ticks})
+    return PriceUpdateResponse(received=len(ticks), updated=updated)
+
+
+@router.post("/stocks/prices/stream", response_model=PriceUpdateResponse)
+async def ingest_price_stream(request: Request, current_user: Principal = Depends(get_current_user)):
+    """
+    Streaming ingest of NDJSON ticks (`{"ticker": ..., "stock_price": ...}` per line).
+    Ticks are coalesced per ticker and written by the background flusher; lines that
+    are not a valid tick are skipped and counted as rejected.
+    """
+    received, rejected, buffer = 0, 0, b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        accepted, skipped = _ingest_lines(lines)
+        received, rejected = received + accepted, rejected + skipped
+    accepted, skipped = _ingest_lines([buffer])
+    return PriceUpdateResponse(received=received + accepted, updated=0, rejected=rejected + skipped)
+
+
+@router.websocket("/stocks/prices/ws")
+async def ingest_price_socket(websocket: WebSocket, token: str):
+    """
+    WebSocket ingest: every message is a tick object or a list of them.
+    Authenticates with the access token passed as the `token` query parameter.
+    Invalid ticks are dropped and answered with an error frame counting them; the
+    connection stays open.
+    """
+    try:
+        await get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                tick_coalescer.reject()
+                await websocket.send_json({"error": "Invalid JSON", "rejected": 1})
+                continue
+            rejected = 0
+            for item in message if isinstance(message, list) else [message]:
+                try:
+                    tick = PriceTick.model_validate(item)
+                except ValidationError:
+                    rejected += 1
+                    continue
+                tick_coalescer.add(tick.ticker, tick.stock_price)
+            if rejected:
+                tick_coalescer.reject(rejected)
+                await websocket.send_json({"error": "Invalid ticks", "rejected": rejected})
+    except WebSocketDisconnect:
+        pass
+
+
+def _ingest_lines(lines) -> Tuple[int, int]:
+    """Add every valid tick line to the coalescer; returns (accepted, rejected)."""
+    accepted = rejected = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            tick = PriceTick.model_validate_json(line)
+        except ValidationError:
+            rejected += 1
+            continue
+        tick_coalescer.add(tick.ticker, tick.stock_price)
+        accepted += 1
+    tick_coalescer.reject(rejected)
+    return accepted, rejected
+
+
+@router.get("/stocks/prices/stats")
+async def price_ingestion_stats():
+    """Counters of the tick coalescer."""
+    return tick_coalescer.stats()
+
+
+@router.get("/stocks/cache/stats")
+async def stock_cache_stats():
+    """Hit/miss counters of the stock reference cache and of the encoded response cache."""
+    return {**stock_cache.stats(), "responses": response_cache.stats()}
+
+
+@router.get("/stocks/stats/top", response_model=list[StockLeaderboardEntry])
+async def get_top_stocks(
+        by: str = Query("volume", pattern="^(" + "|".join(RANKINGS) + ")$"),
+        window: str = Query("24h", pattern="^(" + "|".join(WINDOWS) + ")$"),
+        limit: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)
+):
+    """Leaderboard of the most traded stocks over a window, served from the stock_stats summary."""
+    logger.info("getting top stocks by %s over %s", by, window)
+    return await top_stocks(db, window, by, limit)
+
 
 @router.get("/stocks/{ticker}", response_model=StockResponse)
-def get_stock(ticker: str, db: Session = Depends(get_db)):
-    logger.info(f"getting stock {ticker}")
-    stock = db.query(Stocks).filter(Stocks.ticker == ticker).first()
+async def get_stock(ticker: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Conditional GET of one stock, cached (and read on a miss) like the listing."""
+    logger.info("getting stock %s", ticker)
+    key = stock_tag(ticker)
+    cached = response_cache.get(key)
+    if cached is None:
+        since = response_cache.version
+        stock = await stock_cache.get(db, ticker)
+        if stock is None:
+            raise HTTPException(status_code=404, detail="Stock not found")
+        cached = response_cache.put(key, StockResponse(**stock).model_dump_json().encode(), [key], since)
+    return conditional_response(request, cached, stock_cache_control())
+
+
+@router.get("/stocks/{ticker}/stats", response_model=StockStatsResponse)
+async def get_trading_stats(ticker: str, db: AsyncSession = Depends(get_db)):
+    """Traded volume, notional, VWAP and trade count of a stock over each rolling window."""
+    logger.info("getting trading stats of %s", ticker)
+    stock = await stock_cache.get(db, ticker)
     if stock is None:
         raise HTTPException(status_code=404, detail="Stock not found")
-    return stock
+    return {"ticker": stock["ticker"], "windows": await get_stock_stats(db, stock["id"])}
+
+
+@router.get("/stocks/{ticker}/bars", response_model=list[PriceBarResponse])
+async def get_price_bars(
+        ticker: str,
+        interval: str = Query("1m", pattern="^(" + "|".join(INTERVALS) + ")$"),
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = Query(1000, ge=1, le=10000),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    OHLCV bars of a stock, read from the precomputed bars of the requested interval.
+    Without `start` the most recent `limit` bars up to `end` are returned.
+    """
+    logger.info("getting %s bars of %s", interval, ticker)
+    stock = await stock_cache.get(db, ticker)
+    if stock is None:
+        raise HTTPException(status_code=404, detail="Stock not found")
+
+    query = select(PriceBar).where(PriceBar.stock_id == stock["id"], PriceBar.interval == interval)
+    if start is not None:
+        query = query.where(PriceBar.bucket_start >= as_naive_utc(start)).order_by(PriceBar.bucket_start)
+    else:
+        query = query.order_by(PriceBar.bucket_start.desc())
+    if end is not None:
+        query = query.where(PriceBar.bucket_start < as_naive_utc(end))
+
+    bars = (await db.execute(query.limit(limit))).scalars().all()
+    return bars if start is not None else bars[::-1]
@@ -1,164 +1,367 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from common.authentication import get_current_user
+import asyncio
+import json
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Optional, Tuple, Union
+from common.authentication import Principal, get_current_user
+from common.pagination import decode_cursor, encode_cursor
+from common.rate_limit import order_rate_limit
+from common.responses import FastJSONResponse
+from common.timeutils import as_naive_utc
+from config.config import settings
 from config.logger import logger
-from database.db import get_db
+from database.db import AsyncSessionLocal, get_db, get_read_db
 from models.transaction import Transaction
 from models.stock import Stocks
 from models.users import Users
-from schemas.transaction_schema import TransactionCreate, TransactionResponse
+from schemas.transaction_schema import (TransactionAggregate, TransactionBatchResponse, TransactionCreate,
+                                        TransactionResponse)
+from services.idempotency import fingerprint, idempotency_store
+from services.order_execution import ALL_OR_NOTHING, BEST_EFFORT, execute_order, execute_order_batch, normalize_side
+from services.stock_cache import stock_cache
+from services.transaction_export import FORMATS, MEDIA_TYPES, PARQUET, build_encoder, export_query, parquet_available
+from services.transaction_reports import aggregate_transactions
 from datetime import datetime
 
 transaction_router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+MAX_BATCH_SIZE = 10000
 
-@transaction_router.post("/transactions", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
+
+@transaction_router.post("/transactions", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED,
+                         dependencies=[Depends(order_rate_limit)])
 async def create_transaction(
         transaction: TransactionCreate,
-        db: Session = Depends(get_db),
-        current_user: str = Depends(get_current_user)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user),
+        idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)
 ):
     """
-    Creates a new transaction (buy/sell stocks), checks balance, updates accordingly.
+    Creates a new transaction (buy/sell stocks) through the order execution service,
+    which checks balance or holdings and updates them atomically.
+
+    With an `Idempotency-Key` header the response is stored with the transaction, and
+    a retry with the same key and body gets it back (flagged `Idempotent-Replayed`)
+    instead of placing the order again.
     """
     logger.info("Creating new transaction ")
+    if idempotency_key is None:
+        return await place_transaction(db, transaction, current_user)
+
+    request_fingerprint = fingerprint(transaction.model_dump_json().encode())
+
+    async def execute():
+        def stage(response: TransactionResponse):
+            idempotency_store.stage(db, current_user.id, idempotency_key, request_fingerprint,
+                                    status.HTTP_201_CREATED, response.model_dump(mode="json"), response.id)
+
+        response = await place_transaction(db, transaction, current_user, stage)
+        return status.HTTP_201_CREATED, response.model_dump(mode="json")
+
+    return await idempotency_store.run(db, current_user.id, idempotency_key, request_fingerprint, execute)
+
+
+async def place_transaction(db: AsyncSession, transaction: TransactionCreate, current_user: Principal,
+                            stage: Optional[Callable[[TransactionResponse], None]] = None) -> TransactionResponse:
+    """Validate and execute one market order; `stage` sees the response before the order commits."""
     if transaction.transaction_volume <= 0:
         raise HTTPException(status_code=404, detail="Volume must be greater than 0")
 
-    if transaction.transaction_type not in ["BUY","SELL","Buy","Sell","sell","buy"]:
-        raise HTTPException(status_code=404, detail="Transaction type must be BUY or SELL")
+    side = normalize_side(transaction.transaction_type)
 
-    stock = db.query(Stocks).filter(Stocks.ticker == transaction.ticker).first()
+    stock = await stock_cache.get(db, transaction.ticker)
     if not stock:
         raise HTTPException(status_code=404, detail="Stock not found")
 
-    # Query user by username
-    user = db.query(Users).filter(Users.username == transaction.username).first()
-    if not user:
+    # The token already identifies the caller; only orders placed for another user need a lookup
+    if transaction.username == current_user.username:
+        user_id = current_user.id
+    else:
+        user_id = (await db.execute(select(Users.id).where(Users.username == transaction.username))).scalar()
+    if user_id is None:
         raise HTTPException(status_code=404, detail="User not found")
 
+    def build_response(transaction_id: int, created_time: datetime, stock_price: float) -> TransactionResponse:
+        return TransactionResponse(
+            id=transaction_id,
+            transaction_volume=transaction.transaction_volume,
+            transaction_type=side,
+            transaction_price=stock_price * transaction.transaction_volume,
+            created_time=created_time,
+            username=transaction.username,
+            ticker=stock["ticker"]
+        )
+
+    def before_commit(transaction_id: int, created_time: datetime, stock_price: float):
+        stage(build_response(transaction_id, created_time, stock_price))
+
+    executed = await execute_order(
+        db, user_id, stock["id"], side, transaction.transaction_volume, before_commit if stage is not None else None
+    )
+    return build_response(*executed)
 
-    # Calculate transaction price
-    transaction_price = stock.stock_price * transaction.transaction_volume
 
-    if transaction.transaction_type == 'BUY' or 'Buy' or 'buy':
-        if user.balance < transaction_price:
-            raise HTTPException(status_code=400, detail="Insufficient balance")
-        user.balance -= transaction_price
-    elif transaction.transaction_type == 'SELL' or 'Sell' or 'sell':
-        user.balance += transaction_price
+@transaction_router.post("/transactions/batch", response_model=TransactionBatchResponse,
+                         status_code=status.HTTP_201_CREATED, dependencies=[Depends(order_rate_limit)])
+async def create_transaction_batch(
+        response: Response,
+        transactions: list[TransactionCreate] = Body(..., min_length=1),
+        mode: str = Query(ALL_OR_NOTHING, pattern=f"^({ALL_OR_NOTHING}|{BEST_EFFORT})$"),
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user)
+):
+    """
+    Executes a list of orders with bulk lookups, executemany writes and one commit.
 
-    new_transaction = Transaction(
-        user_id=user.id,
-        ticker_id=stock.id,
-        transaction_price=transaction_price,
-        transaction_volume=transaction.transaction_volume,
-        transaction_type=transaction.transaction_type
-    )
+    In `all_or_nothing` mode any rejected order rolls back the whole batch (400);
+    in `best_effort` mode the valid orders are committed and the rest reported.
+    """
+    logger.info("Creating %d transactions in batch", len(transactions))
+    if len(transactions) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch cannot exceed {MAX_BATCH_SIZE} orders")
 
-    # Add and commit the transaction
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
-
-    # Prepare the response
-    response = TransactionResponse(
-        id=new_transaction.id,
-        transaction_volume=new_transaction.transaction_volume,
-        transaction_type=new_transaction.transaction_type,
-        transaction_price=new_transaction.transaction_price,
-        created_time=new_transaction.created_time,
-        username=user.username,
-        ticker=stock.ticker
-    )
+    committed, results = await execute_order_batch(db, transactions, mode)
+    if not committed:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+    return TransactionBatchResponse(committed=committed, results=results)
 
-    return response
+
+def transaction_rows_query():
+    """
+    Single joined query projecting only the columns TransactionResponse needs,
+    ordered by the (created_time, id) keyset.
+    """
+    return select(
+        Transaction.id,
+        Transaction.transaction_volume,
+        Transaction.transaction_type,
+        Transaction.transaction_price,
+        Transaction.created_time,
+        Users.username,
+        Stocks.ticker
+    ).join(Users, Users.id == Transaction.user_id) \
+        .join(Stocks, Stocks.id == Transaction.ticker_id) \
+        .order_by(Transaction.created_time, Transaction.id)
+
+
+def after_cursor(query, cursor: Optional[Tuple[datetime, int]]):
+    """Restrict a keyset-ordered transaction query to rows after the cursor position."""
+    if cursor is None:
+        return query
+    created_time, row_id = cursor
+    return query.where(or_(
+        Transaction.created_time > created_time,
+        and_(Transaction.created_time == created_time, Transaction.id > row_id)
+    ))
+
+
+def row_to_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "transaction_volume": row.transaction_volume,
+        "transaction_type": row.transaction_type,
+        "transaction_price": row.transaction_price,
+        "created_time": row.created_time.isoformat(),
+        "username": row.username,
+        "ticker": row.ticker
+    }
+
+
+def listing_response(rows, response: Response):
+    """
+    Transaction rows as the endpoint's result. With FAST_JSON_LISTINGS they are encoded
+    by orjson as fetched; otherwise FastAPI validates them against the response_model.
+    """
+    # zip over the shared column names is several times cheaper than Row._asdict()
+    keys = rows[0]._fields if rows else ()
+    items = [dict(zip(keys, row)) for row in rows]
+    if not settings.FAST_JSON_LISTINGS:
+        return items
+    # A returned response replaces the injected one, so its headers are carried over
+    return FastJSONResponse(items, headers=dict(response.headers))
+
+
+async def stream_transaction_rows(fmt: str, cursor: Optional[Tuple[datetime, int]], read_only: bool = False,
+                                  chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Yield every transaction after the cursor as NDJSON lines or as one JSON array,
+    fetching rows in fixed-size chunks so memory stays flat.
+    The generator owns its session because it outlives the request dependency.
+    """
+    async with AsyncSessionLocal(info={"read_only": read_only}) as db:
+        rows = await db.stream(
+            after_cursor(transaction_rows_query(), cursor).execution_options(yield_per=chunk_size)
+        )
+        if fmt == "ndjson":
+            async for row in rows:
+                yield json.dumps(row_to_dict(row)) + "\n"
+            return
+
+        yield "["
+        first = True
+        async for row in rows:
+            yield ("" if first else ",") + json.dumps(row_to_dict(row))
+            first = False
+        yield "]"
 
 
 @transaction_router.get("/transactions/", response_model=list[TransactionResponse])
-def list_transaction(db: Session = Depends(get_db)):
-    list_trans = db.query(Transaction).all()
+async def list_transaction(
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        stream: Optional[str] = Query(None, pattern="^(ndjson|json)$"),
+        db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Lists transactions ordered by (created_time, id).
 
+    By default returns one page of `limit` rows; the cursor for the next page is sent
+    in the `X-Next-Cursor` header. With `stream=ndjson|json` every remaining row is
+    streamed instead of paginated.
+    """
     logger.info("List all the transactions")
+    position = decode_cursor(cursor)
 
-    response = []
-    for transaction in list_trans:
-        user = db.query(Users).filter(Users.id == transaction.user_id).first()
-        stock = db.query(Stocks).filter(Stocks.id == transaction.ticker_id).first()
-        response.append(TransactionResponse(
-            id=transaction.id,
-            transaction_volume=transaction.transaction_volume,
-            transaction_type=transaction.transaction_type,
-            transaction_price=transaction.transaction_price,
-            created_time=transaction.created_time,
-            username=user.username if user else None,  # Handle possible None
-            ticker=stock.ticker if stock else None       # Handle possible None
-        ))
+    if stream:
+        media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+        rows = stream_transaction_rows(stream, position, db.info["read_only"])
+        return StreamingResponse(rows, media_type=media_type)
 
-    return response
+    rows = (await db.execute(after_cursor(transaction_rows_query(), position).limit(limit))).all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_time, rows[-1].id)
+
+    return listing_response(rows, response)
+
+
+async def stream_export(fmt: str, start: Optional[datetime], end: Optional[datetime], user_id: Optional[int],
+                        read_only: bool = False):
+    """
+    Encode the export chunk by chunk as rows arrive from the server-side cursor. Encoding
+    runs in a thread so other requests keep being served between GIL switches.
+    """
+    encoder = build_encoder(fmt)
+    yield encoder.header()
+    async with AsyncSessionLocal(info={"read_only": read_only}) as db:
+        rows = await db.stream(export_query(start, end, user_id))
+        async for chunk in rows.partitions():
+            yield await asyncio.to_thread(encoder.encode, chunk)
+    yield encoder.close()
+
+
+@transaction_router.get("/transactions/export")
+async def export_transactions(
+        fmt: str = Query("csv", alias="format", pattern="^(" + "|".join(FORMATS) + ")$"),
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Streams the transaction history, optionally between two timestamps (inclusive, naive
+    taken as UTC) and for one user, as a CSV or Parquet file in id order. Rows are read
+    through a server-side cursor and encoded a chunk at a time, so memory stays flat
+    whatever the size of the export.
+    """
+    logger.info("Exporting transactions as %s", fmt)
+    start_timestamp = as_naive_utc(start) if start is not None else None
+    end_timestamp = as_naive_utc(end) if end is not None else None
+    if start_timestamp is not None and end_timestamp is not None and start_timestamp > end_timestamp:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if fmt == PARQUET and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export is not available on this server")
+
+    user_id = None
+    if user is not None:
+        user_id = (await db.execute(select(Users.id).where(Users.username == user))).scalar()
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+    return StreamingResponse(
+        stream_export(fmt, start_timestamp, end_timestamp, user_id, db.info["read_only"]),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{fmt}"'}
+    )
 
 
-@transaction_router.get("/transactions/{username}/by-date", response_model=list[TransactionResponse],
+@transaction_router.get("/transactions/{username}/by-date",
+                        response_model=Union[list[TransactionResponse], list[TransactionAggregate]],
                         status_code=status.HTTP_200_OK)
 async def list_transactions_by_timestamp(
         username: str,
-        start_time: str,
-        end_time: str,
-        db: Session = Depends(get_db)
+        response: Response,
+        start_time: datetime,
+        end_time: datetime,
+        ticker: Optional[str] = None,
+        aggregate: Optional[str] = Query(None, pattern="^(daily|hourly)$"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Lists transactions by username, filtered by start and end timestamp.
+    Lists a user's transactions between two ISO-8601 timestamps (inclusive), optionally
+    for one ticker. Naive timestamps are taken to be UTC.
+
+    Rows are returned one page of `limit` at a time, ordered by (created_time, id), with
+    the next page's cursor in the `X-Next-Cursor` header. With `aggregate=daily|hourly`
+    per-bucket, per-ticker volume and notional sums are returned instead of rows.
     """
 
     logger.info("Listing transactions by timestamp")
-    user = db.query(Users).filter(Users.username == username).first()
+    start_timestamp, end_timestamp = as_naive_utc(start_time), as_naive_utc(end_time)
+    if start_timestamp > end_timestamp:
+        raise HTTPException(status_code=400, detail="start_time must not be after end_time")
 
-    if not user:
+    user_id = (await db.execute(select(Users.id).where(Users.username == username))).scalar()
+    if user_id is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    try:
-        start_timestamp = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
-        end_timestamp = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format")
+    stock_id = None
+    if ticker is not None:
+        stock = await stock_cache.get(db, ticker)
+        if not stock:
+            raise HTTPException(status_code=404, detail="Stock not found")
+        stock_id = stock["id"]
 
-    transactions = db.query(Transaction).filter(
-        Transaction.user_id == user.id,  # Filter transactions by user ID
+    if aggregate:
+        return await aggregate_transactions(db, user_id, start_timestamp, end_timestamp, aggregate, stock_id)
+
+    query = transaction_rows_query().where(
+        Transaction.user_id == user_id,  # Filter transactions by user ID
         Transaction.created_time.between(start_timestamp, end_timestamp)
-    ).all()
+    )
+    if stock_id is not None:
+        query = query.where(Transaction.ticker_id == stock_id)
+
+    rows = (await db.execute(after_cursor(query, decode_cursor(cursor)).limit(limit))).all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_time, rows[-1].id)
 
-    return transactions
+    return listing_response(rows, response)
 
 @transaction_router.get("/transactions/user/{username}", response_model=list[TransactionResponse], status_code=status.HTTP_200_OK)
-async def get_transactions_by_username(username: str, db: Session = Depends(get_db)):
+async def get_transactions_by_username(username: str, response: Response, db: AsyncSession = Depends(get_read_db)):
     """
     Retrieve all transactions for a specific user identified by their username.
     """
     logger.info("Retrieving transactions by username")
 
-    user = db.query(Users).filter(Users.username == username).first()
+    user = (await db.execute(select(Users).where(Users.username == username))).scalars().first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    transactions = db.query(Transaction).filter(Transaction.user_id == user.id).all()
+    transactions = (await db.execute(transaction_rows_query().where(Transaction.user_id == user.id))).all()
 
     if not transactions:
         raise HTTPException(status_code=404, detail="No transactions found for this user")
 
-
-    response = []
-    for transaction in transactions:
-        response.append(TransactionResponse(
-            id=transaction.id,
-            transaction_volume=transaction.transaction_volume,
-            transaction_type=transaction.transaction_type,
-            transaction_price=transaction.transaction_price,
-            created_time=transaction.created_time,
-            username=user.username,
-            ticker=transaction.ticker.ticker
-        ))
-
-    return response
+    return listing_response(transactions, response)
 
 
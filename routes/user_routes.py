@@ -1,22 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
-from common.authentication import get_password_hash, pwd_context, create_access_token, verify_password
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.password_pool import password_pool
+from common.rate_limit import login_rate_limit
+from common.responses import conditional_response
 from config.logger import logger
 from models.users import Users
-from schemas.user_schema import UserCreate, UserResponse
+from schemas.user_schema import PortfolioResponse, UserCreate, UserResponse
 from database.db import get_db
+from services.portfolio import get_portfolio
+from services.response_cache import response_cache, user_tag
 
 user_router = APIRouter()
 
-@user_router.post("/register")
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+@user_router.post("/register", dependencies=[Depends(login_rate_limit)])
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
         Creating a new user.
     """
     logger.info("Registering new user")
     # Check if the username already exists
-    existing_user = db.query(Users).filter_by(username=user.username).first()
+    existing_user = (await db.execute(select(Users).filter_by(username=user.username))).scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
 
@@ -24,7 +29,7 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Balance must be greater than zero")
 
     # Hash the password and create the user
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await password_pool.hash(user.password)
     new_user = Users(
         username=user.username,
 
@@ -34,25 +39,44 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
     try:
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
         return {"message": "User created successfully", "user_id": new_user.id}
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while creating the user")
 
 
 @user_router.get("/users/{username}", response_model=UserResponse, status_code=status.HTTP_200_OK)
-async def get_user(username: str, db: Session = Depends(get_db)):
+async def get_user(username: str, request: Request, db: AsyncSession = Depends(get_db)):
     """
-    Retrieves user details by username.
+    Retrieves user details by username. The encoded response is cached until a trade
+    of the user commits, and clients revalidate it with If-None-Match. Misses read
+    the primary, so a lagging replica cannot refill the cache with the old balance.
     """
     logger.info("Retrieving user details by username")
-    user = db.query(Users).filter(Users.username == username).first()
+    key = f"user:{username}"
+    cached = response_cache.get(key)
+    if cached is None:
+        since = response_cache.version
+        user = (await db.execute(select(Users).where(Users.username == username))).scalars().first()
+
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        body = UserResponse(id=user.id, username=user.username, balance=user.balance).model_dump_json().encode()
+        cached = response_cache.put(key, body, [user_tag(user.id)], since)
+    return conditional_response(request, cached, "private, no-cache")
 
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
+@user_router.get("/users/{username}/portfolio", response_model=PortfolioResponse, status_code=status.HTTP_200_OK)
+async def get_user_portfolio(username: str, db: AsyncSession = Depends(get_db)):
+    """
+    Holdings per ticker with average cost, market value and unrealized/realized P&L.
+    """
+    logger.info("Retrieving portfolio by username")
+    user = (await db.execute(select(Users.id, Users.balance).where(Users.username == username))).first()
 
-    return UserResponse(id=user.id, username=user.username, balance=user.balance)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
+    return PortfolioResponse(username=username, balance=user.balance, **await get_portfolio(db, user.id))
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class OrderCreate(BaseModel):
+    ticker: str = Field(..., description="Ticker symbol of the stock")
+    side: str = Field(..., description="BUY or SELL")
+    price: float = Field(..., description="Limit price: the most a buyer pays or the least a seller accepts")
+    volume: int = Field(..., description="Number of shares")
+
+
+class OrderFill(BaseModel):
+    price: float
+    volume: float
+    counterparty_order_id: int
+
+
+class OrderResponse(BaseModel):
+    id: int
+    ticker: str
+    side: str
+    price: float
+    volume: float
+    remaining: float
+    status: str
+    created_time: datetime
+    fills: list[OrderFill] = []
+
+    class Config:
+        from_attributes = True
+
+
+class OrderBookLevel(BaseModel):
+    price: float
+    volume: float
+
+
+class OrderBookSnapshot(BaseModel):
+    ticker: str
+    best_bid: Optional[float] = None
+    best_ask: Optional[float] = None
+    bids: list[OrderBookLevel]
+    asks: list[OrderBookLevel]
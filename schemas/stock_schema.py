@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 
 class StockCreate(BaseModel):
     ticker: str
@@ -9,3 +10,43 @@ class StockResponse(StockCreate):
     id: int
     class Config:
         from_attributes = True
+
+class PriceTick(BaseModel):
+    ticker: str
+    # finite as well as positive: NaN slips through a plain `<= 0` check
+    stock_price: float = Field(gt=0, allow_inf_nan=False)
+
+class PriceUpdateResponse(BaseModel):
+    received: int
+    updated: int
+    # ticks skipped because they were malformed or had an invalid price
+    rejected: int = 0
+
+class PriceBarResponse(BaseModel):
+    bucket_start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+    class Config:
+        from_attributes = True
+
+class StockWindowStats(BaseModel):
+    window: str
+    trades: int
+    volume: float
+    notional: float
+    vwap: float
+
+class StockStatsResponse(BaseModel):
+    ticker: str
+    windows: list[StockWindowStats]
+
+class StockLeaderboardEntry(BaseModel):
+    ticker: str
+    trades: int
+    volume: float
+    notional: float
+    vwap: float
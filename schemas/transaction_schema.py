@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
 
 class TransactionBase(BaseModel):
     username: str = Field(..., description="Username of the user making the transaction")
@@ -24,3 +25,25 @@ class TransactionResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TransactionBatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the order in the submitted batch")
+    status_code: int = Field(..., description="HTTP status the order would have received on its own")
+    transaction: Optional[TransactionResponse] = None
+    error: Optional[str] = None
+
+
+class TransactionBatchResponse(BaseModel):
+    committed: bool = Field(..., description="Whether any order of the batch was written")
+    results: list[TransactionBatchItemResult]
+
+
+class TransactionAggregate(BaseModel):
+    bucket_start: datetime = Field(..., description="Start of the hourly or daily bucket")
+    ticker: str
+    trades: int
+    buy_volume: float
+    sell_volume: float
+    buy_notional: float
+    sell_notional: float
@@ -13,3 +13,19 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PortfolioPosition(BaseModel):
+    ticker: str
+    quantity: float
+    average_cost: float
+    stock_price: float
+    market_value: float
+    unrealized_pnl: float
+    realized_pnl: float
+
+class PortfolioResponse(BaseModel):
+    username: str
+    balance: float
+    positions: list[PortfolioPosition]
+    market_value: float
+    unrealized_pnl: float
+    realized_pnl: float
@@ -0,0 +1,55 @@
+"""
+Write the transaction history to a local CSV or Parquet file, reading it through a
+server-side cursor a chunk at a time like GET /transactions/export:
+
+    python -m scripts.export_transactions transactions.parquet --format parquet \\
+        --start 2024-01-01 --end 2024-12-31 --user alice
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import select
+
+from common.timeutils import as_naive_utc
+from config.logger import logger
+from database.db import engine
+from models.users import Users
+from services.transaction_export import EXPORT_CHUNK_SIZE, FORMATS, build_encoder, export_query
+
+
+def export(path: str, fmt: str, start=None, end=None, user_id=None, chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    encoder = build_encoder(fmt)
+    count = 0
+    with open(path, "wb") as out, engine.connect() as conn:
+        out.write(encoder.header())
+        for chunk in conn.execute(export_query(start, end, user_id, chunk_size)).partitions():
+            out.write(encoder.encode(chunk))
+            count += len(chunk)
+        out.write(encoder.close())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--start", type=datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.fromisoformat)
+    parser.add_argument("--user", help="username")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    user_id = None
+    if args.user is not None:
+        with engine.connect() as conn:
+            user_id = conn.execute(select(Users.id).where(Users.username == args.user)).scalar()
+        if user_id is None:
+            parser.error(f"user {args.user} not found")
+
+    count = export(args.output, args.format, args.start and as_naive_utc(args.start),
+                   args.end and as_naive_utc(args.end), user_id, args.chunk_size)
+    logger.info("Exported %d transactions to %s", count, args.output)
+
+
+if __name__ == "__main__":
+    main()
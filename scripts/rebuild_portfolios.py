@@ -0,0 +1,23 @@
+"""
+Recompute the holdings table (positions, buy and sell totals, cost basis and
+realized P&L) from the full transactions history in one ordered pass:
+
+    python -m scripts.rebuild_portfolios
+"""
+from sqlalchemy import func, select
+
+from config.logger import logger
+from database.db import engine
+from models.holdings import Holdings
+from services.portfolio import rebuild_holdings
+
+
+def main():
+    with engine.begin() as conn:
+        rebuild_holdings(conn)
+        count = conn.execute(select(func.count()).select_from(Holdings)).scalar()
+    logger.info("Rebuilt %d holdings rows", count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Rebuild the stock_stats summary and its hourly rollup from the transactions table
+with set-based SQL:
+
+    python -m scripts.reconcile_stock_stats
+
+The Celery beat schedule in config/tasks.py runs the same job periodically.
+"""
+from sqlalchemy import func, select
+
+from config.logger import logger
+from database.db import engine
+from models.stock_stats import StockStats
+from services.stock_stats import reconcile_stock_stats
+
+
+def main():
+    with engine.begin() as conn:
+        reconcile_stock_stats(conn)
+        count = conn.execute(select(func.count()).select_from(StockStats)).scalar()
+    logger.info("Reconciled %d stock_stats rows", count)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,83 @@
-from datetime import timedelta
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from common.authentication import verify_password, create_access_token, get_password_hash
+from common.authentication import create_access_token, oauth2_scheme, revoke_token
+from common.load_shedding import LoadSheddingMiddleware, load_shedder
+from common.metrics import MetricsMiddleware
+from common.password_pool import password_pool
+from common.rate_limit import login_rate_limit
+from common.read_your_writes import ReadYourWritesMiddleware
+from common.request_logging import RequestLoggingMiddleware
 from config.logger import logger
-from database.db import get_db
+from database.db import AsyncSessionLocal, get_db
 from models.users import Users
-from routes import user_routes, stock_routes, transaction_routes
+from routes import market_data_routes, metrics_routes, order_routes, user_routes, stock_routes, transaction_routes
+from services.limit_orders import load_order_books
+from services.outbox import outbox_relay
+from services.price_feed import price_feed
+from services.price_history import price_history
+from services.stock_stats import stock_stats
+from services.tick_ingestion import tick_coalescer
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with AsyncSessionLocal() as db:
+        logger.info("Recovered %d open orders into the order books", await load_order_books(db))
+    tick_coalescer.start()
+    price_history.start()
+    stock_stats.start()
+    outbox_relay.start()
+    price_feed.start()
+    yield
+    await tick_coalescer.stop()
+    await price_history.stop()
+    await stock_stats.stop()
+    await outbox_relay.stop()
+    await price_feed.stop()
+    password_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(LoadSheddingMiddleware, shedder=load_shedder)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestLoggingMiddleware)
 
 app.include_router(user_routes.user_router)
 app.include_router(stock_routes.router)
 app.include_router(transaction_routes.transaction_router)
+app.include_router(order_routes.order_router)
+app.include_router(market_data_routes.market_data_router)
+app.include_router(metrics_routes.metrics_router)
 
 
 
-@app.post("/login")
-async def login_oauth2(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    logger.info(f"login user: username ={form_data.username}")
-    db_user = db.query(Users).filter_by(username=form_data.username).first()
-    if not db_user or not verify_password(form_data.password, db_user.hashed_password):
+@app.post("/login", dependencies=[Depends(login_rate_limit)])
+async def login_oauth2(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    logger.info("login user: username=%s", form_data.username)
+    db_user = (await db.execute(select(Users).filter_by(username=form_data.username))).scalars().first()
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await password_pool.verify_and_update(form_data.password, db_user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # The stored hash predates the current bcrypt settings
+        await db.execute(update(Users).where(Users.id == db_user.id).values(hashed_password=new_hash))
+        await db.commit()
 
-    access_token = create_access_token(data={"sub": db_user.username})
+    access_token = create_access_token(data={"sub": db_user.username, "uid": db_user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@app.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme)):
+    """Revoke the presented access token."""
+    revoke_token(token)
+    return {"message": "Logged out"}
+
+
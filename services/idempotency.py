@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.timeutils import as_aware_utc
+from config.config import settings
+from config.logger import logger
+from models.idempotency import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: int
+    body: Dict
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Responses of requests sent with an Idempotency-Key, per user.
+
+    A bounded in-process LRU sits in front of the idempotency_keys table, which is the
+    record of truth and is written in the same DB transaction as the order. Duplicates
+    arriving while the first request is still running wait for it in this worker; across
+    workers the primary key makes the later commit fail, and it replays the stored response.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, StoredResponse]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.replayed = 0
+
+    def _get_local(self, entry_key: Tuple[int, str]) -> Optional[StoredResponse]:
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[entry_key]
+            return None
+        self._entries.move_to_end(entry_key)
+        return entry[1]
+
+    def _put_local(self, entry_key: Tuple[int, str], stored: StoredResponse, ttl: float):
+        self._entries[entry_key] = (time.monotonic() + ttl, stored)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def lookup(self, db: AsyncSession, user_id: int, key: str) -> Optional[StoredResponse]:
+        """The stored response for the key, from memory or else the database; expired rows are deleted."""
+        stored = self._get_local((user_id, key))
+        if stored is not None:
+            return stored
+        row = (await db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response,
+                   IdempotencyKey.expires_at)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        )).one_or_none()
+        if row is None:
+            return None
+        remaining = (as_aware_utc(row.expires_at) - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            # deleted in the transaction that stores the new outcome
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id,
+                                                          IdempotencyKey.key == key))
+            return None
+        stored = StoredResponse(row.fingerprint, row.status_code, row.response)
+        self._put_local((user_id, key), stored, remaining)
+        return stored
+
+    def stage(self, db: AsyncSession, user_id: int, key: str, request_fingerprint: str, status_code: int,
+              body: Dict, transaction_id: Optional[int] = None):
+        """Add the outcome to the caller's transaction; call before it commits."""
+        db.add(IdempotencyKey(
+            user_id=user_id, key=key, fingerprint=request_fingerprint, transaction_id=transaction_id,
+            status_code=status_code, response=body,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        ))
+
+    def replay(self, stored: StoredResponse, request_fingerprint: str) -> JSONResponse:
+        if stored.fingerprint != request_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        self.replayed += 1
+        return JSONResponse(stored.body, status_code=stored.status_code, headers={REPLAYED_HEADER: "true"})
+
+    async def run(self, db: AsyncSession, user_id: int, key: str, request_fingerprint: str,
+                  execute: Callable[[], Awaitable[Tuple[int, Dict]]]):
+        """
+        Replay the stored response for the key, or run `execute` once. `execute` must
+        stage() its outcome and commit; it returns the status code and body, which are
+        then kept in memory. Failures are not stored, so a retry runs the request again.
+        """
+        entry_key = (user_id, key)
+        stored = self._get_local(entry_key)
+        if stored is not None:
+            return self.replay(stored, request_fingerprint)
+
+        while entry_key in self._in_flight:
+            await asyncio.shield(self._in_flight[entry_key])
+        self._in_flight[entry_key] = asyncio.get_running_loop().create_future()
+        try:
+            stored = await self.lookup(db, user_id, key)
+            if stored is not None:
+                return self.replay(stored, request_fingerprint)
+            try:
+                status_code, body = await execute()
+            except IntegrityError:
+                # another worker committed the same key first; the order was rolled back
+                await db.rollback()
+                stored = await self.lookup(db, user_id, key)
+                if stored is None:
+                    raise
+                logger.info("Idempotency-Key raced another worker, replaying its response")
+                return self.replay(stored, request_fingerprint)
+            self._put_local(entry_key, StoredResponse(request_fingerprint, status_code, body), self.ttl)
+            return body
+        finally:
+            self._in_flight.pop(entry_key).set_result(None)
+
+
+def purge_expired_keys(conn) -> int:
+    """Delete expired idempotency keys on a synchronous connection."""
+    return conn.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+    ).rowcount
+
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_TTL)
@@ -0,0 +1,209 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.holdings import Holdings
+from models.order import Order
+from models.transaction import Transaction
+from models.users import Users
+from services.order_book import EPSILON, BookOrder, Fill, OrderBook, order_books
+from services.order_execution import BUY, HOLDING_TOTALS, credit_balance, debit_balance, upsert_holdings
+from services.price_feed import TRADE, price_feed
+from services.price_history import price_history
+from services.response_cache import response_cache, user_tag
+from services.stock_stats import stock_stats
+
+OPEN = "open"
+FILLED = "filled"
+CANCELLED = "cancelled"
+
+
+async def reserve_position(db: AsyncSession, user_id: int, stock_id: int, volume: float):
+    """Set aside shares for a resting SELL order, failing if the user holds fewer than `volume`."""
+    result = await db.execute(
+        update(Holdings)
+        .where(Holdings.user_id == user_id, Holdings.stock_id == stock_id, Holdings.quantity >= volume)
+        .values(quantity=Holdings.quantity - volume)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=400, detail="Insufficient holdings")
+
+
+async def release_position(db: AsyncSession, user_id: int, stock_id: int, volume: float):
+    await db.execute(
+        update(Holdings)
+        .where(Holdings.user_id == user_id, Holdings.stock_id == stock_id)
+        .values(quantity=Holdings.quantity + volume)
+    )
+
+
+async def load_order_books(db: AsyncSession) -> int:
+    """Rebuild every in-memory book from the open orders, oldest first. Called on startup."""
+    rows = (await db.execute(
+        select(Order.id, Order.user_id, Order.stock_id, Order.side, Order.price, Order.remaining)
+        .where(Order.status == OPEN)
+        .order_by(Order.id)
+    )).all()
+    for row in rows:
+        order_books.get(row.stock_id).add(BookOrder(row.id, row.user_id, row.side, row.price, row.remaining))
+    return len(rows)
+
+
+async def reload_order_book(db: AsyncSession, stock_id: int, book: OrderBook):
+    """Replace one book's contents with the open orders stored for the stock."""
+    book.clear()
+    rows = (await db.execute(
+        select(Order.id, Order.user_id, Order.side, Order.price, Order.remaining)
+        .where(Order.status == OPEN, Order.stock_id == stock_id)
+        .order_by(Order.id)
+    )).all()
+    for row in rows:
+        book.add(BookOrder(row.id, row.user_id, row.side, row.price, row.remaining))
+
+
+async def fill_order(db: AsyncSession, order_id: int, volume: float):
+    """
+    Take `volume` off an open order's stored remaining volume, failing with 409 when the
+    order is no longer open or has less left, i.e. another worker's book filled or a
+    cancel closed it since this book was loaded.
+    """
+    table = Order.__table__
+    remaining = table.c.remaining - volume
+    result = await db.execute(
+        update(table)
+        .where(table.c.id == order_id, table.c.status == OPEN, table.c.remaining >= volume - EPSILON)
+        .values(remaining=case((remaining <= EPSILON, 0.0), else_=remaining),
+                status=case((remaining <= EPSILON, FILLED), else_=OPEN))
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=409, detail="Order book changed, retry the order")
+
+
+async def settle_fills(db: AsyncSession, stock_id: int, fills: List[Fill]):
+    """
+    Write the fills of one incoming order: cash and shares of both sides, the
+    remaining volume of every order touched, and a BUY and a SELL transaction per fill.
+
+    Buyers paid their limit price when the order was placed and get the difference back;
+    sellers' shares were set aside then, so only their sale totals change here.
+    Remaining volumes are decremented only where the stored order still has them, so a
+    resting order cannot be filled twice by the books of two workers.
+    """
+    balance_deltas: Dict[int, float] = defaultdict(float)
+    position_deltas: Dict[int, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(HOLDING_TOTALS, 0.0))
+    filled: Dict[int, float] = defaultdict(float)
+    transactions = []
+    for fill in fills:
+        buyer, seller = (fill.incoming, fill.resting) if fill.incoming.side == BUY else (fill.resting, fill.incoming)
+        amount = fill.price * fill.volume
+        balance_deltas[buyer.user_id] += (buyer.price - fill.price) * fill.volume
+        balance_deltas[seller.user_id] += amount
+        bought, sold = position_deltas[buyer.user_id], position_deltas[seller.user_id]
+        bought["quantity"] += fill.volume
+        bought["bought_volume"] += fill.volume
+        bought["bought_cost"] += amount
+        sold["sold_volume"] += fill.volume
+        sold["sold_proceeds"] += amount
+        filled[buyer.id] += fill.volume
+        filled[seller.id] += fill.volume
+        for order in (buyer, seller):
+            transactions.append({"user_id": order.user_id, "ticker_id": stock_id, "transaction_type": order.side,
+                                 "transaction_volume": fill.volume, "transaction_price": amount,
+                                 "order_id": order.id})
+
+    # lowest id first, the order every worker takes the row locks in
+    for order_id, volume in sorted(filled.items()):
+        await fill_order(db, order_id, volume)
+
+    conn = await db.connection()
+    users = Users.__table__
+    await conn.execute(
+        update(users).where(users.c.id == bindparam("b_id")).values(balance=users.c.balance + bindparam("b_delta")),
+        [{"b_id": user_id, "b_delta": delta} for user_id, delta in sorted(balance_deltas.items())]
+    )
+    await upsert_holdings(db, [{"user_id": user_id, "stock_id": stock_id, **deltas}
+                               for user_id, deltas in sorted(position_deltas.items())])
+    await conn.execute(insert(Transaction.__table__), transactions)
+
+
+async def place_limit_order(db: AsyncSession, user_id: int, stock_id: int, side: str, price: float,
+                            volume: float) -> Tuple[Dict, List[Fill]]:
+    """
+    Reserve cash (BUY) or shares (SELL), store the order, then match it against the
+    stock's book and settle the fills in the same DB transaction. The book's lock is
+    held throughout so matching order equals commit order.
+    """
+    book = order_books.get(stock_id)
+    async with book.lock:
+        matched = False
+        try:
+            if side == BUY:
+                await debit_balance(db, user_id, price * volume)
+            else:
+                await reserve_position(db, user_id, stock_id, volume)
+            order_id, created_time = (await db.execute(
+                insert(Order).values(user_id=user_id, stock_id=stock_id, side=side, price=price, volume=volume,
+                                     remaining=volume, status=OPEN)
+                .returning(Order.id, Order.created_time)
+            )).one()
+            matched = True
+            incoming = BookOrder(order_id, user_id, side, price, volume)
+            fills = book.match(incoming)
+            if fills:
+                await settle_fills(db, stock_id, fills)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            if matched:
+                # the book may have matched ahead of the rolled-back writes
+                await reload_order_book(db, stock_id, book)
+            raise
+
+    response_cache.bump(user_tag(user_id), *(user_tag(fill.resting.user_id) for fill in fills))
+    for fill in fills:
+        price_history.record(stock_id, fill.price, fill.volume)
+        stock_stats.record(stock_id, fill.volume, fill.price * fill.volume)
+        price_feed.publish(TRADE, stock_id, fill.price, fill.volume)
+    remaining = max(incoming.remaining, 0.0)
+    return {
+        "id": order_id,
+        "side": side,
+        "price": price,
+        "volume": volume,
+        "remaining": remaining,
+        "status": FILLED if remaining <= EPSILON else OPEN,
+        "created_time": created_time,
+    }, fills
+
+
+async def cancel_limit_order(db: AsyncSession, order_id: int, user_id: int) -> Order:
+    """Take an open order off the book and release what it still had reserved."""
+    order = await db.get(Order, order_id)
+    if order is None or order.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    book = order_books.get(order.stock_id)
+    async with book.lock:
+        try:
+            # conditional, so a fill committed by another worker's book is seen, not overwritten
+            remaining = (await db.execute(
+                update(Order).where(Order.id == order_id, Order.status == OPEN)
+                .values(status=CANCELLED).returning(Order.remaining)
+            )).scalar()
+            if remaining is None:
+                raise HTTPException(status_code=400, detail="Order is not open")
+            if order.side == BUY:
+                await credit_balance(db, user_id, order.price * remaining)
+            else:
+                await release_position(db, user_id, order.stock_id, remaining)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        await db.refresh(order)
+        response_cache.bump(user_tag(user_id))
+        book.cancel(order_id)
+    return order
@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+from services.order_execution import BUY, SELL
+
+# Quantities below this are treated as zero when levels are drained.
+EPSILON = 1e-9
+
+
+class BookOrder:
+    """A resting or incoming limit order as the matching engine sees it."""
+
+    __slots__ = ("id", "user_id", "side", "price", "remaining")
+
+    def __init__(self, id: int, user_id: int, side: str, price: float, remaining: float):
+        self.id = id
+        self.user_id = user_id
+        self.side = side
+        self.price = price
+        self.remaining = remaining
+
+
+class Fill(NamedTuple):
+    incoming: BookOrder
+    resting: BookOrder
+    price: float
+    volume: float
+
+
+class OrderBook:
+    """
+    Price-time priority book of one stock.
+
+    Bids and asks are binary heaps keyed by (price, order id), bids with the price
+    negated, so the best order is always at index 0 and the id breaks ties by arrival.
+    Cancelled orders are left in the heap with nothing remaining and skipped when
+    they surface. Aggregate volume per price level is kept alongside for depth
+    snapshots. `lock` serializes matching and settlement of the stock.
+    """
+
+    def __init__(self):
+        self.bids: List[tuple] = []
+        self.asks: List[tuple] = []
+        self.orders: Dict[int, BookOrder] = {}
+        self.levels = {BUY: defaultdict(float), SELL: defaultdict(float)}
+        self.lock = asyncio.Lock()
+
+    def clear(self):
+        """Drop every order, keeping the lock so waiters stay on the same book."""
+        self.bids.clear()
+        self.asks.clear()
+        self.orders.clear()
+        self.levels[BUY].clear()
+        self.levels[SELL].clear()
+
+    def _best(self, heap: List[tuple]) -> Optional[BookOrder]:
+        while heap and heap[0][2].remaining <= EPSILON:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def _reduce_level(self, order: BookOrder, volume: float):
+        level = self.levels[order.side]
+        level[order.price] -= volume
+        if level[order.price] <= EPSILON:
+            del level[order.price]
+
+    def add(self, order: BookOrder):
+        """Rest an order without matching it, e.g. when recovering the book."""
+        if order.side == BUY:
+            heapq.heappush(self.bids, (-order.price, order.id, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.id, order))
+        self.orders[order.id] = order
+        self.levels[order.side][order.price] += order.remaining
+
+    def match(self, order: BookOrder) -> List[Fill]:
+        """
+        Cross an incoming order against the opposite side at the resting orders'
+        prices, best price first and oldest first within a price. Whatever is left
+        rests in the book.
+        """
+        fills = []
+        opposite = self.asks if order.side == BUY else self.bids
+        while order.remaining > EPSILON:
+            best = self._best(opposite)
+            if best is None or (best.price > order.price if order.side == BUY else best.price < order.price):
+                break
+            volume = min(order.remaining, best.remaining)
+            order.remaining -= volume
+            best.remaining -= volume
+            self._reduce_level(best, volume)
+            if best.remaining <= EPSILON:
+                heapq.heappop(opposite)
+                del self.orders[best.id]
+            fills.append(Fill(order, best, best.price, volume))
+        if order.remaining > EPSILON:
+            self.add(order)
+        return fills
+
+    def cancel(self, order_id: int) -> Optional[BookOrder]:
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            self._reduce_level(order, order.remaining)
+            order.remaining = 0.0
+        return order
+
+    def best_bid(self) -> Optional[float]:
+        best = self._best(self.bids)
+        return best.price if best else None
+
+    def best_ask(self) -> Optional[float]:
+        best = self._best(self.asks)
+        return best.price if best else None
+
+    def depth(self, levels: int) -> Dict[str, List[Dict[str, float]]]:
+        """Aggregate volume of the best `levels` price levels on each side."""
+        return {
+            "bids": [{"price": price, "volume": self.levels[BUY][price]}
+                     for price in heapq.nlargest(levels, self.levels[BUY])],
+            "asks": [{"price": price, "volume": self.levels[SELL][price]}
+                     for price in heapq.nsmallest(levels, self.levels[SELL])],
+        }
+
+
+class OrderBooks:
+    """The order books of every stock, created on first use."""
+
+    def __init__(self):
+        self._books: Dict[int, OrderBook] = {}
+
+    def get(self, stock_id: int) -> OrderBook:
+        book = self._books.get(stock_id)
+        if book is None:
+            book = self._books[stock_id] = OrderBook()
+        return book
+
+
+order_books = OrderBooks()
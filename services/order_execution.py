@@ -0,0 +1,343 @@
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.db import dialect_insert
+from models.holdings import Holdings
+from models.stock import Stocks
+from models.transaction import Transaction
+from models.users import Users
+from schemas.transaction_schema import TransactionBatchItemResult, TransactionCreate, TransactionResponse
+from services.price_feed import TRADE, price_feed
+from services.price_history import price_history
+from services.response_cache import response_cache, user_tag
+from services.stock_cache import stock_cache
+from services.stock_stats import stock_stats
+
+BUY = "BUY"
+SELL = "SELL"
+
+
+def normalize_side(transaction_type: str) -> str:
+    """Map any casing of BUY/SELL onto the canonical side, rejecting anything else."""
+    side = transaction_type.upper()
+    if side not in (BUY, SELL):
+        raise HTTPException(status_code=404, detail="Transaction type must be BUY or SELL")
+    return side
+
+
+async def debit_balance(db: AsyncSession, user_id: int, amount: float):
+    """Atomically take `amount` from the user's balance, failing if it would go negative."""
+    result = await db.execute(
+        update(Users)
+        .where(Users.id == user_id, Users.balance >= amount)
+        .values(balance=Users.balance - amount)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=400, detail="Insufficient balance")
+
+
+async def credit_balance(db: AsyncSession, user_id: int, amount: float):
+    await db.execute(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(balance=Users.balance + amount)
+    )
+
+
+# Holdings columns that trades change by adding a delta.
+HOLDING_TOTALS = ("quantity", "bought_volume", "bought_cost", "sold_volume", "sold_proceeds")
+
+
+def holding_deltas(side: str, volume: float, amount: float) -> Dict[str, float]:
+    if side == BUY:
+        return {"quantity": volume, "bought_volume": volume, "bought_cost": amount,
+                "sold_volume": 0.0, "sold_proceeds": 0.0}
+    return {"quantity": -volume, "bought_volume": 0.0, "bought_cost": 0.0,
+            "sold_volume": volume, "sold_proceeds": amount}
+
+
+def sold_cost(cost_basis, owned, volume):
+    """SQL for the cost basis `volume` of `owned` shares take with them at average cost."""
+    return case((owned > 0, cost_basis * volume / owned), else_=0.0)
+
+
+def opening_basis(row: Dict) -> Dict[str, float]:
+    """cost_basis and realized_pnl of a new holdings row made from one delta, buys first."""
+    sold = row["bought_cost"] * row["sold_volume"] / row["bought_volume"] if row["bought_volume"] > 0 else 0.0
+    return {"cost_basis": row["bought_cost"] - sold, "realized_pnl": row["sold_proceeds"] - sold}
+
+
+async def upsert_holdings(db: AsyncSession, rows: List[Dict]):
+    """
+    Add per-(user_id, stock_id) deltas of HOLDING_TOTALS, creating missing rows; one
+    executemany. The buys of a delta are applied before its sells, both to the cost
+    basis; callers split deltas where a buy follows a sell.
+    """
+    table = Holdings.__table__
+    statement = dialect_insert(db, table)
+    excluded = statement.excluded
+    cost_basis = table.c.cost_basis + excluded.bought_cost
+    sold = sold_cost(cost_basis, table.c.bought_volume - table.c.sold_volume + excluded.bought_volume,
+                     excluded.sold_volume)
+    conn = await db.connection()
+    await conn.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.stock_id],
+            set_={
+                **{name: table.c[name] + excluded[name] for name in HOLDING_TOTALS},
+                "cost_basis": cost_basis - sold,
+                "realized_pnl": table.c.realized_pnl + (excluded.sold_proceeds - sold),
+            }
+        ),
+        [{**row, **opening_basis(row)} for row in rows]
+    )
+
+
+async def add_position(db: AsyncSession, user_id: int, stock_id: int, volume: float, amount: float):
+    await upsert_holdings(db, [{"user_id": user_id, "stock_id": stock_id, **holding_deltas(BUY, volume, amount)}])
+
+
+async def remove_position(db: AsyncSession, user_id: int, stock_id: int, volume: float, amount: float):
+    """Atomically reduce the position, failing if the user holds fewer than `volume` shares."""
+    sold = sold_cost(Holdings.cost_basis, Holdings.bought_volume - Holdings.sold_volume, volume)
+    result = await db.execute(
+        update(Holdings)
+        .where(Holdings.user_id == user_id, Holdings.stock_id == stock_id, Holdings.quantity >= volume)
+        .values(
+            quantity=Holdings.quantity - volume,
+            sold_volume=Holdings.sold_volume + volume,
+            sold_proceeds=Holdings.sold_proceeds + amount,
+            cost_basis=Holdings.cost_basis - sold,
+            realized_pnl=Holdings.realized_pnl + (amount - sold)
+        )
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=400, detail="Insufficient holdings")
+
+
+async def apply_trade(db: AsyncSession, user_id: int, stock_id: int, side: str, volume: float, amount: float):
+    """
+    Move cash and shares for one fill. The users row is always written first so
+    concurrent BUY and SELL orders of one account lock rows in the same order.
+    """
+    if side == BUY:
+        await debit_balance(db, user_id, amount)
+        await add_position(db, user_id, stock_id, volume, amount)
+    else:
+        await credit_balance(db, user_id, amount)
+        await remove_position(db, user_id, stock_id, volume, amount)
+
+
+async def record_transaction(db: AsyncSession, user_id: int, stock_id: int, side: str, volume: float,
+                             amount: float) -> Tuple[int, datetime]:
+    """Insert the Transaction row and return its id and created_time without a refresh round trip."""
+    result = await db.execute(
+        insert(Transaction)
+        .values(
+            user_id=user_id,
+            ticker_id=stock_id,
+            transaction_type=side,
+            transaction_volume=volume,
+            transaction_price=amount
+        )
+        .returning(Transaction.id, Transaction.created_time)
+    )
+    return tuple(result.one())
+
+
+async def current_prices(db: AsyncSession, stock_ids) -> Dict[int, float]:
+    """
+    Prices as stored now, read in the caller's transaction. Orders execute at these
+    rather than the stock cache's, which may be up to STOCK_CACHE_TTL seconds old.
+    """
+    return dict((await db.execute(select(Stocks.id, Stocks.stock_price).where(Stocks.id.in_(stock_ids)))).all())
+
+
+async def execute_order(db: AsyncSession, user_id: int, stock_id: int, side: str, volume: float,
+                        before_commit: Optional[Callable[[int, datetime, float], None]] = None
+                        ) -> Tuple[int, datetime, float]:
+    """
+    Execute a market order at the stock's current price in one short DB transaction,
+    returning the transaction id, its created_time and the price.
+
+    Balance and holdings are changed with conditional UPDATEs, so concurrent orders
+    against the same account can neither lose updates nor overdraw it.
+    `before_commit(transaction_id, created_time, stock_price)` may stage more rows in
+    the same transaction.
+    """
+    try:
+        stock_price = (await current_prices(db, [stock_id])).get(stock_id)
+        if stock_price is None:
+            raise HTTPException(status_code=404, detail="Stock not found")
+        amount = stock_price * volume
+        await apply_trade(db, user_id, stock_id, side, volume, amount)
+        transaction_id, created_time = await record_transaction(db, user_id, stock_id, side, volume, amount)
+        if before_commit is not None:
+            before_commit(transaction_id, created_time, stock_price)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    response_cache.bump(user_tag(user_id))
+    price_history.record(stock_id, stock_price, volume)
+    stock_stats.record(stock_id, volume, amount)
+    price_feed.publish(TRADE, stock_id, stock_price, volume)
+    return transaction_id, created_time, stock_price
+
+
+ALL_OR_NOTHING = "all_or_nothing"
+BEST_EFFORT = "best_effort"
+
+
+async def execute_order_batch(db: AsyncSession, orders: List[TransactionCreate],
+                              mode: str = ALL_OR_NOTHING) -> Tuple[bool, List[TransactionBatchItemResult]]:
+    """
+    Execute a batch of market orders with one query per lookup (tickers come from
+    the stock cache when warm, prices from the batch's transaction), in-memory
+    validation, executemany writes and a single commit.
+
+    Users and holdings rows are read FOR UPDATE and then changed by deltas, and a
+    final guard re-checks for negative balances or positions, so a batch racing
+    single orders on a database without row locks is rolled back instead of
+    overdrawing an account.
+    """
+    results: Dict[int, TransactionBatchItemResult] = {}
+
+    tickers = {order.ticker for order in orders}
+    usernames = {order.username for order in orders}
+    cached = await stock_cache.get_many(db, tickers)
+    prices = await current_prices(db, [stock["id"] for stock in cached.values()])
+    stocks = {
+        ticker: SimpleNamespace(**{**stock, "stock_price": prices[stock["id"]]})
+        for ticker, stock in cached.items() if stock["id"] in prices
+    }
+    users = {
+        row.username: row for row in await db.execute(
+            select(Users.id, Users.username, Users.balance)
+            .where(Users.username.in_(usernames))
+            .order_by(Users.id)
+            .with_for_update()
+        )
+    }
+    balances = {row.id: row.balance for row in users.values()}
+    positions = {
+        (row.user_id, row.stock_id): row.quantity for row in await db.execute(
+            select(Holdings.user_id, Holdings.stock_id, Holdings.quantity)
+            .where(Holdings.user_id.in_(balances), Holdings.stock_id.in_([s.id for s in stocks.values()]))
+            .with_for_update()
+        )
+    }
+
+    fills = []
+    balance_deltas: Dict[int, float] = defaultdict(float)
+    # per position, a list of deltas: a BUY after a SELL starts a new one, written in a
+    # later round, so the cost basis follows the order of execution
+    position_deltas: Dict[Tuple[int, int], List[Dict[str, float]]] = defaultdict(list)
+    for index, order in enumerate(orders):
+        try:
+            if order.transaction_volume <= 0:
+                raise HTTPException(status_code=404, detail="Volume must be greater than 0")
+            side = normalize_side(order.transaction_type)
+            stock = stocks.get(order.ticker)
+            if stock is None:
+                raise HTTPException(status_code=404, detail="Stock not found")
+            user = users.get(order.username)
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+
+            key = (user.id, stock.id)
+            amount = stock.stock_price * order.transaction_volume
+            if side == BUY:
+                if balances[user.id] < amount:
+                    raise HTTPException(status_code=400, detail="Insufficient balance")
+                balances[user.id] -= amount
+                balance_deltas[user.id] -= amount
+                positions[key] = positions.get(key, 0) + order.transaction_volume
+            else:
+                if positions.get(key, 0) < order.transaction_volume:
+                    raise HTTPException(status_code=400, detail="Insufficient holdings")
+                positions[key] -= order.transaction_volume
+                balances[user.id] += amount
+                balance_deltas[user.id] += amount
+            deltas = position_deltas[key]
+            if not deltas or (side == BUY and deltas[-1]["sold_volume"]):
+                deltas.append(dict.fromkeys(HOLDING_TOTALS, 0.0))
+            for name, delta in holding_deltas(side, order.transaction_volume, amount).items():
+                deltas[-1][name] += delta
+            fills.append((index, order, side, user, stock, amount))
+        except HTTPException as error:
+            results[index] = TransactionBatchItemResult(index=index, status_code=error.status_code,
+                                                        error=error.detail)
+
+    if not fills or (results and mode == ALL_OR_NOTHING):
+        await db.rollback()
+        for index, *_ in fills:
+            results[index] = TransactionBatchItemResult(index=index, status_code=409,
+                                                        error="Batch rolled back")
+        return False, [results[index] for index in sorted(results)]
+
+    try:
+        conn = await db.connection()
+        await conn.execute(
+            update(Users.__table__)
+            .where(Users.__table__.c.id == bindparam("b_id"))
+            .values(balance=Users.__table__.c.balance + bindparam("b_delta")),
+            [{"b_id": user_id, "b_delta": delta} for user_id, delta in balance_deltas.items()]
+        )
+        for round_ in range(max(len(deltas) for deltas in position_deltas.values())):
+            await upsert_holdings(db, [{"user_id": user_id, "stock_id": stock_id, **deltas[round_]}
+                                       for (user_id, stock_id), deltas in position_deltas.items()
+                                       if len(deltas) > round_])
+        overdrawn = (await conn.execute(
+            select(func.count()).select_from(Users.__table__)
+            .where(Users.__table__.c.id.in_(balance_deltas), Users.__table__.c.balance < 0)
+        )).scalar() + (await conn.execute(
+            select(func.count()).select_from(Holdings.__table__)
+            .where(Holdings.__table__.c.user_id.in_(balance_deltas), Holdings.__table__.c.quantity < 0)
+        )).scalar()
+        if overdrawn:
+            raise HTTPException(status_code=409, detail="Concurrent update, retry the batch")
+
+        inserted = await conn.execute(
+            insert(Transaction.__table__).returning(
+                Transaction.__table__.c.id, Transaction.__table__.c.created_time, sort_by_parameter_order=True
+            ),
+            [{
+                "user_id": user.id,
+                "ticker_id": stock.id,
+                "transaction_type": side,
+                "transaction_volume": order.transaction_volume,
+                "transaction_price": amount
+            } for _, order, side, user, stock, amount in fills]
+        )
+        rows = inserted.all()
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    response_cache.bump(*(user_tag(user_id) for user_id in balance_deltas))
+    for (index, order, side, user, stock, amount), row in zip(fills, rows):
+        price_history.record(stock.id, stock.stock_price, order.transaction_volume)
+        stock_stats.record(stock.id, order.transaction_volume, amount)
+        price_feed.publish(TRADE, stock.id, stock.stock_price, order.transaction_volume)
+        results[index] = TransactionBatchItemResult(
+            index=index,
+            status_code=201,
+            transaction=TransactionResponse(
+                id=row.id,
+                transaction_volume=order.transaction_volume,
+                transaction_type=side,
+                transaction_price=amount,
+                created_time=row.created_time,
+                username=user.username,
+                ticker=stock.ticker
+            )
+        )
+    return True, [results[index] for index in sorted(results)]
@@ -0,0 +1,87 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.background import PeriodicFlusher
+from config.config import settings
+from config.logger import logger
+from config.tasks import notify_new_stocks
+from database.db import AsyncSessionLocal
+from models.outbox import OutboxEvent
+
+STOCK_CREATED = "stock_created"
+
+# event type -> Celery task that takes a list of event payloads
+HANDLERS = {
+    STOCK_CREATED: notify_new_stocks,
+}
+
+
+def add_event(db: AsyncSession, event_type: str, payload: Dict):
+    """Stage an event in the caller's transaction; it is relayed only if that transaction commits."""
+    db.add(OutboxEvent(event_type=event_type, payload=payload))
+
+
+class OutboxRelay(PeriodicFlusher):
+    """
+    Moves committed outbox events to Celery: once per window it reads up to
+    `batch_size` events, sends each event type as one task carrying the whole batch,
+    and deletes the rows in the same transaction.
+
+    Publishing runs in a thread with a timeout, so a slow or unreachable broker never
+    blocks the event loop. When publishing fails the batch is run in-process instead.
+    Delivery is at-least-once: a publish that times out may still reach the broker.
+    """
+
+    def __init__(self, window: float, batch_size: int, publish_timeout: float):
+        super().__init__(window)
+        self.batch_size = batch_size
+        self.publish_timeout = publish_timeout
+        self.published = 0
+        self.ran_locally = 0
+
+    def publish(self, task, payloads: List[Dict]):
+        task.apply_async((payloads,), retry=False)
+
+    async def dispatch(self, event_type: str, payloads: List[Dict]):
+        task = HANDLERS[event_type]
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self.publish, task, payloads), self.publish_timeout)
+            self.published += len(payloads)
+        except Exception:
+            logger.warning("Broker unavailable, running %d %s events in-process", len(payloads), event_type)
+            await asyncio.to_thread(task.run, payloads)
+            self.ran_locally += len(payloads)
+
+    async def flush(self) -> int:
+        relayed = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                events = (await db.execute(
+                    select(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload)
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )).all()
+                if not events:
+                    return relayed
+                batches = defaultdict(list)
+                for event in events:
+                    batches[event.event_type].append(event.payload)
+                for event_type, payloads in batches.items():
+                    await self.dispatch(event_type, payloads)
+                await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events])))
+                await db.commit()
+            relayed += len(events)
+            if len(events) < self.batch_size:
+                return relayed
+
+    def stats(self) -> Dict[str, int]:
+        return {"published": self.published, "ran_locally": self.ran_locally}
+
+
+outbox_relay = OutboxRelay(settings.OUTBOX_RELAY_INTERVAL, settings.OUTBOX_BATCH_SIZE,
+                           settings.OUTBOX_PUBLISH_TIMEOUT)
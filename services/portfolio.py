@@ -0,0 +1,101 @@
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.holdings import Holdings
+from models.order import Order
+from models.stock import Stocks
+from models.transaction import Transaction
+from services.limit_orders import OPEN
+from services.order_execution import BUY, SELL
+
+
+async def get_portfolio(db: AsyncSession, user_id: int) -> Dict:
+    """
+    Value a user's positions from the incrementally maintained holdings totals and
+    the current stock prices. One indexed query per call, whatever the length of
+    the user's transaction history.
+
+    Costs use the average price of the shares still owned: the holdings cost basis
+    drops proportionally on each sale, which also books that sale's realized P&L,
+    so a closed and reopened position is measured against the new buys only.
+    """
+    rows = (await db.execute(
+        select(Holdings, Stocks.ticker, Stocks.stock_price)
+        .join(Stocks, Stocks.id == Holdings.stock_id)
+        .where(Holdings.user_id == user_id)
+        .order_by(Stocks.ticker)
+    )).all()
+
+    positions: List[Dict] = []
+    for holding, ticker, stock_price in rows:
+        owned = holding.bought_volume - holding.sold_volume
+        average_cost = holding.cost_basis / owned if owned > 0 else 0.0
+        market_value = holding.quantity * stock_price
+        positions.append({
+            "ticker": ticker,
+            "quantity": holding.quantity,
+            "average_cost": average_cost,
+            "stock_price": stock_price,
+            "market_value": market_value,
+            "unrealized_pnl": market_value - holding.quantity * average_cost,
+            "realized_pnl": holding.realized_pnl,
+        })
+    return {
+        "positions": positions,
+        "market_value": sum(position["market_value"] for position in positions),
+        "unrealized_pnl": sum(position["unrealized_pnl"] for position in positions),
+        "realized_pnl": sum(position["realized_pnl"] for position in positions),
+    }
+
+
+def rebuild_holdings(conn, chunk_size: int = 50_000):
+    """
+    Recompute every holdings row from the transactions table, then set aside the
+    shares of open SELL limit orders. Runs on a synchronous connection inside the
+    caller's transaction.
+
+    The cost basis depends on the order of buys and sells, so the history is
+    streamed once in (created_time, id) order, off its keyset index, and folded per
+    position the way order execution updates holdings.
+    """
+    positions: Dict[Tuple[int, int], List[float]] = {}
+    rows = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+        select(Transaction.user_id, Transaction.ticker_id, Transaction.transaction_type,
+               Transaction.transaction_volume, Transaction.transaction_price)
+        .order_by(Transaction.created_time, Transaction.id)
+    )
+    for user_id, stock_id, side, volume, amount in rows:
+        # bought_volume, bought_cost, sold_volume, sold_proceeds, cost_basis, realized_pnl
+        position = positions.get((user_id, stock_id))
+        if position is None:
+            position = positions[(user_id, stock_id)] = [0.0] * 6
+        if side.upper() == BUY:
+            position[0] += volume
+            position[1] += amount
+            position[4] += amount
+        else:
+            owned = position[0] - position[2]
+            sold = position[4] * volume / owned if owned > 0 else 0.0
+            position[2] += volume
+            position[3] += amount
+            position[4] -= sold
+            position[5] += amount - sold
+
+    conn.execute(delete(Holdings))
+    holdings = [{
+        "user_id": user_id, "stock_id": stock_id, "quantity": bought_volume - sold_volume,
+        "bought_volume": bought_volume, "bought_cost": bought_cost, "sold_volume": sold_volume,
+        "sold_proceeds": sold_proceeds, "cost_basis": cost_basis, "realized_pnl": realized_pnl,
+    } for (user_id, stock_id), (bought_volume, bought_cost, sold_volume, sold_proceeds, cost_basis, realized_pnl)
+        in positions.items()]
+    for offset in range(0, len(holdings), chunk_size):
+        conn.execute(insert(Holdings), holdings[offset:offset + chunk_size])
+    reserved = select(func.coalesce(func.sum(Order.remaining), 0.0)).where(
+        Order.user_id == Holdings.user_id,
+        Order.stock_id == Holdings.stock_id,
+        Order.side == SELL,
+        Order.status == OPEN
+    ).scalar_subquery()
+    conn.execute(update(Holdings).values(quantity=Holdings.quantity - reserved))
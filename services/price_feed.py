@@ -0,0 +1,187 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from common.background import PeriodicFlusher
+from config.config import settings
+from config.logger import logger
+
+PRICE = "price"
+TRADE = "trade"
+
+
+class Subscriber:
+    """
+    A consumer's bounded queue of pending events.
+
+    Events are conflated per (type, stock): a newer price or trade of a stock replaces
+    the pending one, so a slow consumer receives the latest state rather than a backlog.
+    Past `max_pending` distinct keys the oldest pending event is dropped.
+    """
+
+    __slots__ = ("stock_ids", "max_pending", "pending", "ready", "conflated", "dropped")
+
+    def __init__(self, stock_ids: Iterable[int], max_pending: int):
+        self.stock_ids: Set[int] = set(stock_ids)
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.conflated = 0
+        self.dropped = 0
+
+    def put(self, event: Dict):
+        key = (event["type"], event["stock_id"])
+        if key in self.pending:
+            self.conflated += 1
+            del self.pending[key]
+        elif len(self.pending) >= self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = event
+        self.ready.set()
+
+    async def get(self) -> List[Dict]:
+        """Wait for events, then take everything pending."""
+        await self.ready.wait()
+        self.ready.clear()
+        events = list(self.pending.values())
+        self.pending.clear()
+        return events
+
+
+class LocalBackend:
+    """In-process delivery: events only reach subscribers of this worker."""
+
+    def __init__(self):
+        self.deliver: Optional[Callable[[List[Dict]], None]] = None
+
+    async def start(self, deliver: Callable[[List[Dict]], None]):
+        self.deliver = deliver
+
+    async def publish(self, events: List[Dict]):
+        self.deliver(events)
+
+    async def stop(self):
+        pass
+
+
+class RedisBackend:
+    """Redis pub/sub channel shared by every uvicorn worker; each worker fans out to its own subscribers."""
+
+    def __init__(self, url: str, channel: str = "price-feed"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[List[Dict]], None]):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+
+        async def listen():
+            async for message in pubsub.listen():
+                try:
+                    deliver(json.loads(message["data"]))
+                except Exception:
+                    logger.exception("Dropping malformed price feed message")
+
+        self._listener = asyncio.create_task(listen())
+
+    async def publish(self, events: List[Dict]):
+        await self.client.publish(self.channel, json.dumps(events))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+
+class PriceFeedHub(PeriodicFlusher):
+    """
+    Fan-out of price and trade events to subscribers by stock id.
+
+    Producers call publish() from the request path; it only buffers. Once per window
+    the buffer goes to the backend in one message, and the backend hands it to
+    deliver() in every worker, which puts each event on the queues of that stock's
+    subscribers.
+    """
+
+    def __init__(self, window: float, backend, max_pending: int):
+        super().__init__(window)
+        self.backend = backend
+        self.max_pending = max_pending
+        self._outgoing: List[Dict] = []
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self.delivered = 0
+
+    def publish(self, event_type: str, stock_id: int, price: float, volume: float = 0.0):
+        self._outgoing.append({
+            "type": event_type, "stock_id": stock_id, "price": price, "volume": volume, "time": time.time()
+        })
+
+    def publish_prices(self, prices: Dict[int, float]):
+        for stock_id, price in prices.items():
+            self.publish(PRICE, stock_id, price)
+
+    def subscribe(self, stock_ids: Iterable[int]) -> Subscriber:
+        subscriber = Subscriber(stock_ids, self.max_pending)
+        for stock_id in subscriber.stock_ids:
+            self._subscribers.setdefault(stock_id, set()).add(subscriber)
+        return subscriber
+
+    def update(self, subscriber: Subscriber, add: Iterable[int] = (), remove: Iterable[int] = ()):
+        for stock_id in remove:
+            subscriber.stock_ids.discard(stock_id)
+            subscribers = self._subscribers.get(stock_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[stock_id]
+        for stock_id in add:
+            subscriber.stock_ids.add(stock_id)
+            self._subscribers.setdefault(stock_id, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.update(subscriber, remove=list(subscriber.stock_ids))
+
+    def deliver(self, events: List[Dict]):
+        for event in events:
+            for subscriber in self._subscribers.get(event["stock_id"], ()):
+                subscriber.put(event)
+                self.delivered += 1
+
+    def start(self):
+        super().start()
+        asyncio.get_running_loop().create_task(self.backend.start(self.deliver))
+
+    async def stop(self):
+        await super().stop()
+        await self.backend.stop()
+
+    async def flush(self) -> int:
+        if not self._outgoing:
+            return 0
+        events, self._outgoing = self._outgoing, []
+        await self.backend.publish(events)
+        return len(events)
+
+    def stats(self) -> Dict[str, int]:
+        subscribers = set().union(*self._subscribers.values()) if self._subscribers else set()
+        return {
+            "subscribers": len(subscribers),
+            "delivered": self.delivered,
+            "conflated": sum(subscriber.conflated for subscriber in subscribers),
+            "dropped": sum(subscriber.dropped for subscriber in subscribers),
+        }
+
+
+def build_backend():
+    if settings.PRICE_FEED_REDIS_URL:
+        return RedisBackend(settings.PRICE_FEED_REDIS_URL)
+    return LocalBackend()
+
+
+price_feed = PriceFeedHub(settings.PRICE_FEED_FLUSH_INTERVAL, build_backend(), settings.PRICE_FEED_MAX_PENDING)
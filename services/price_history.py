@@ -0,0 +1,136 @@
+import calendar
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.background import PeriodicFlusher
+from config.config import settings
+from database.db import AsyncSessionLocal, dialect_insert
+from models.price_history import PriceBar, PriceTick
+
+# Bar resolutions kept up to date, in seconds.
+INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+
+def to_epoch(moment: datetime) -> float:
+    """Seconds since the epoch; naive datetimes are taken to be UTC."""
+    return calendar.timegm(moment.utctimetuple()) + moment.microsecond / 1e6
+
+
+def aggregate_bars(stock_ids: np.ndarray, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray,
+                   seconds: int) -> Tuple[np.ndarray, ...]:
+    """
+    Resample ticks into OHLCV bars of `seconds` without Python-level loops.
+
+    Ticks are sorted by (stock, bucket, time); group boundaries are where stock or
+    bucket changes, and reduceat folds each group. Returns parallel arrays of
+    stock_id, bucket_start (epoch seconds), open, high, low, close and volume.
+    """
+    buckets = (timestamps // seconds) * seconds
+    order = np.lexsort((timestamps, buckets, stock_ids))
+    stock_ids, buckets, prices, volumes = stock_ids[order], buckets[order], prices[order], volumes[order]
+
+    changed = (np.diff(stock_ids) != 0) | (np.diff(buckets) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    ends = np.concatenate((starts[1:], [len(prices)])) - 1
+    return (
+        stock_ids[starts],
+        buckets[starts],
+        prices[starts],
+        np.maximum.reduceat(prices, starts),
+        np.minimum.reduceat(prices, starts),
+        prices[ends],
+        np.add.reduceat(volumes, starts),
+    )
+
+
+async def merge_bars(db: AsyncSession, interval: str, bars: Tuple[np.ndarray, ...]):
+    """Upsert freshly aggregated bars into price_bars, extending any bar already stored."""
+    greatest, least = (func.greatest, func.least) if db.get_bind().dialect.name == "postgresql" \
+        else (func.max, func.min)
+    table = PriceBar.__table__
+    statement = dialect_insert(db, table)
+    conn = await db.connection()
+    await conn.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.stock_id, table.c.interval, table.c.bucket_start],
+            set_={
+                "high": greatest(table.c.high, statement.excluded.high),
+                "low": least(table.c.low, statement.excluded.low),
+                "close": statement.excluded.close,
+                "volume": table.c.volume + statement.excluded.volume,
+            }
+        ),
+        [{
+            "stock_id": int(stock_id),
+            "interval": interval,
+            "bucket_start": datetime.utcfromtimestamp(bucket_start),
+            "open": float(open_),
+            "high": float(high),
+            "low": float(low),
+            "close": float(close),
+            "volume": float(volume),
+        } for stock_id, bucket_start, open_, high, low, close, volume in zip(*bars)]
+    )
+
+
+class PriceHistoryRecorder(PeriodicFlusher):
+    """
+    Buffers every stored price and executed trade, then once per window appends them
+    to price_ticks and folds them into the precomputed bars of every interval, so
+    bar queries never rescan raw ticks.
+    """
+
+    def __init__(self, window: float):
+        super().__init__(window)
+        self._reset()
+
+    def _reset(self):
+        self._stock_ids, self._timestamps, self._prices, self._volumes = [], [], [], []
+
+    def record(self, stock_id: int, price: float, volume: float = 0.0, when: Optional[datetime] = None):
+        self._stock_ids.append(stock_id)
+        self._timestamps.append(to_epoch(when or datetime.utcnow()))
+        self._prices.append(price)
+        self._volumes.append(volume)
+
+    def record_prices(self, prices: Dict[int, float]):
+        now = datetime.utcnow()
+        for stock_id, price in prices.items():
+            self.record(stock_id, price, when=now)
+
+    async def flush(self) -> int:
+        if not self._stock_ids:
+            return 0
+        buffered = self._stock_ids, self._timestamps, self._prices, self._volumes
+        self._reset()
+        stock_ids = np.array(buffered[0], dtype=np.int64)
+        timestamps = np.array(buffered[1], dtype=np.float64)
+        prices = np.array(buffered[2], dtype=np.float64)
+        volumes = np.array(buffered[3], dtype=np.float64)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                conn = await db.connection()
+                await conn.execute(insert(PriceTick.__table__), [{
+                    "stock_id": int(stock_id),
+                    "price": float(price),
+                    "volume": float(volume),
+                    "created_time": datetime.utcfromtimestamp(timestamp),
+                } for stock_id, timestamp, price, volume in zip(stock_ids, timestamps, prices, volumes)])
+                for interval, seconds in INTERVALS.items():
+                    await merge_bars(db, interval, aggregate_bars(stock_ids, timestamps, prices, volumes, seconds))
+                await db.commit()
+        except Exception:
+            # Put the ticks back ahead of those recorded meanwhile, so the next flush
+            # writes them in time order.
+            for pending, taken in zip((self._stock_ids, self._timestamps, self._prices, self._volumes), buffered):
+                pending[:0] = taken
+            raise
+        return len(stock_ids)
+
+
+price_history = PriceHistoryRecorder(settings.TICK_FLUSH_INTERVAL)
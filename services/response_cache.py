@@ -0,0 +1,121 @@
+import hashlib
+import time
+from collections import OrderedDict, defaultdict
+from email.utils import formatdate
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from config.config import settings
+
+# Tags writers bump: the stock listing, one stock by ticker, one user by id.
+STOCKS_TAG = "stocks"
+
+
+def stock_tag(ticker: str) -> str:
+    return f"stock:{ticker}"
+
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: str
+    # Last-Modified as a Unix second, for If-Modified-Since
+    modified_second: int
+
+
+class ResponseCache:
+    """
+    Serialized bodies of hot GET responses, each tagged with the rows it was built from.
+
+    Writers call bump() with the tags they changed after committing; that advances a
+    change counter and drops every entry carrying one of the tags. Readers note the
+    counter before querying, and a read that overlaps a bump of its tags is served but not
+    cached. Entries expire after `ttl` seconds, which bounds how long writes made by other
+    uvicorn workers go unseen.
+
+    ETags are a digest of the body rather than the counter, which is per worker, so a
+    client revalidates against whichever worker answers.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse, Tuple[str, ...]]]" = OrderedDict()
+        self._tagged: Dict[str, Set[str]] = defaultdict(set)
+        # tag -> (counter value, wall-clock time) of its last bump, least recent first; older
+        # bumps are forgotten and reads that began before the newest forgotten one are not cached
+        self._bumped: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._forgotten = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, body: bytes, tags: Iterable[str], since: int) -> CachedResponse:
+        """
+        Wrap a body read when the counter stood at `since` and keep it, unless one of
+        its tags has been bumped since then.
+
+        Last-Modified is the read time, but always a second later than the last bump of
+        the tags, so a client validating by date never matches a body from before a write
+        made within the same second.
+        """
+        tags = tuple(tags)
+        bumps = [self._bumped[tag] for tag in tags if tag in self._bumped]
+        modified = max([int(time.time())] + [int(bumped_at) + 1 for _, bumped_at in bumps])
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        cached = CachedResponse(body, etag, formatdate(modified, usegmt=True), modified)
+        if self.ttl <= 0 or since < self._forgotten or any(version > since for version, _ in bumps):
+            return cached
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, cached, tags)
+        for tag in tags:
+            self._tagged[tag].add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+        return cached
+
+    def bump(self, *tags: str):
+        self.version += 1
+        now = time.time()
+        for tag in tags:
+            for key in list(self._tagged.get(tag, ())):
+                self._drop(key)
+            self._bumped[tag] = (self.version, now)
+            self._bumped.move_to_end(tag)
+        while len(self._bumped) > self.max_entries:
+            self._forgotten = max(self._forgotten, self._bumped.popitem(last=False)[1][0])
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def clear(self):
+        self._entries.clear()
+        self._tagged.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "version": self.version}
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL)
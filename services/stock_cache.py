@@ -0,0 +1,154 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from database.db import primary_reads
+from models.stock import Stocks
+from services.response_cache import STOCKS_TAG, response_cache, stock_tag
+
+ALL_STOCKS_KEY = "__all__"
+
+
+class LocalStore:
+    """In-process LRU store with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisStore:
+    """Redis-backed store so every uvicorn worker sees the same entries and invalidations."""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "stock-cache:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value):
+        await self.client.set(self.prefix + key, json.dumps(value), px=int(self.ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    def __len__(self):
+        return 0
+
+
+class StockCache:
+    """
+    Read-through cache of the stock reference data keyed by ticker, plus the full
+    listing under ALL_STOCKS_KEY. Writers must call invalidate() after committing.
+    Misses are loaded from the primary even when the caller's session reads the replica.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    async def _get(self, key: str):
+        value = await self.store.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def get(self, db: AsyncSession, ticker: str) -> Optional[Dict]:
+        stock = await self._get(ticker)
+        if stock is None:
+            async with primary_reads(db) as source:
+                row = (await source.execute(select(Stocks).where(Stocks.ticker == ticker))).scalars().first()
+            if row is None:
+                return None
+            stock = stock_to_dict(row)
+            await self.store.set(ticker, stock)
+        return stock
+
+    async def get_many(self, db: AsyncSession, tickers: Iterable[str]) -> Dict[str, Dict]:
+        """Resolve several tickers, fetching all misses with one IN query."""
+        found, missing = {}, []
+        for ticker in set(tickers):
+            stock = await self._get(ticker)
+            if stock is None:
+                missing.append(ticker)
+            else:
+                found[ticker] = stock
+        if missing:
+            async with primary_reads(db) as source:
+                rows = (await source.execute(select(Stocks).where(Stocks.ticker.in_(missing)))).scalars().all()
+            for row in rows:
+                found[row.ticker] = stock_to_dict(row)
+                await self.store.set(row.ticker, found[row.ticker])
+        return found
+
+    async def get_all(self, db: AsyncSession) -> List[Dict]:
+        stocks = await self._get(ALL_STOCKS_KEY)
+        if stocks is None:
+            async with primary_reads(db) as source:
+                stocks = [stock_to_dict(row) for row in (await source.execute(select(Stocks))).scalars()]
+            await self.store.set(ALL_STOCKS_KEY, stocks)
+        return stocks
+
+    async def invalidate(self, *tickers: str):
+        response_cache.bump(STOCKS_TAG, *(stock_tag(ticker) for ticker in tickers))
+        await self.store.delete(ALL_STOCKS_KEY, *tickers)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.store)}
+
+
+def stock_to_dict(stock: Stocks) -> Dict:
+    return {
+        "id": stock.id,
+        "ticker": stock.ticker,
+        "stock_name": stock.stock_name,
+        "stock_price": stock.stock_price
+    }
+
+
+def build_store():
+    if settings.STOCK_CACHE_REDIS_URL:
+        return RedisStore(settings.STOCK_CACHE_REDIS_URL, settings.STOCK_CACHE_TTL)
+    return LocalStore(settings.STOCK_CACHE_MAX_ENTRIES, settings.STOCK_CACHE_TTL)
+
+
+stock_cache = StockCache(build_store())
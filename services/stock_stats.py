@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.background import PeriodicFlusher
+from common.timeutils import truncate_timestamp
+from config.config import settings
+from database.db import AsyncSessionLocal, dialect_insert
+from models.stock import Stocks
+from models.stock_stats import StockStats, StockStatsHourly
+from models.transaction import Transaction
+
+# Rolling windows in seconds, at hour resolution: a window is its most recent hourly
+# buckets, the current one included. "all" never expires.
+WINDOWS = {"24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400, "all": None}
+RANKINGS = ("volume", "notional", "trades")
+
+HOURLY = StockStatsHourly.__table__
+STATS = StockStats.__table__
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_cutoff(hour: datetime, seconds: int) -> datetime:
+    """Oldest hourly bucket inside a window ending in the bucket starting at `hour`."""
+    return hour - timedelta(seconds=seconds) + timedelta(hours=1)
+
+
+def vwap(row) -> float:
+    return row["notional"] / row["volume"] if row["volume"] else 0.0
+
+
+async def add_totals(db: AsyncSession, table, keys: Tuple[str, ...], rows: List[Dict]):
+    """Upsert rows of trades/volume/notional, adding to the totals already stored."""
+    statement = dialect_insert(db, table)
+    conn = await db.connection()
+    await conn.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c[key] for key in keys],
+            set_={
+                column: table.c[column] + statement.excluded[column]
+                for column in ("trades", "volume", "notional")
+            }
+        ),
+        rows
+    )
+
+
+async def refresh_windows(db: AsyncSession, hour: datetime):
+    """
+    Re-derive every rolling window from the hourly rollup, dropping the buckets that
+    aged out, then prune buckets older than the longest window. One UPDATE per window;
+    the correlated sums are primary-key range scans of stock_stats_hourly.
+    """
+    conn = await db.connection()
+    for window, seconds in WINDOWS.items():
+        if seconds is None:
+            continue
+        cutoff = window_cutoff(hour, seconds)
+
+        def window_sum(column):
+            return select(func.coalesce(func.sum(HOURLY.c[column]), 0)).where(
+                HOURLY.c.stock_id == STATS.c.stock_id,
+                HOURLY.c.bucket_start >= cutoff
+            ).scalar_subquery()
+
+        await conn.execute(
+            update(STATS).where(STATS.c.window == window).values(
+                trades=window_sum("trades"), volume=window_sum("volume"), notional=window_sum("notional")
+            )
+        )
+    longest = max(seconds for seconds in WINDOWS.values() if seconds)
+    await conn.execute(delete(HOURLY).where(HOURLY.c.bucket_start < window_cutoff(hour, longest)))
+
+
+class StockStatsRecorder(PeriodicFlusher):
+    """
+    Accumulates executed trades per (stock, hour) in memory and once per window adds
+    them to the hourly rollup and to every window of the stock_stats summary, so stats
+    and leaderboard reads never aggregate the transactions table.
+
+    New trades only ever add to a window; expiry is applied by refresh_windows when
+    the UTC hour rolls over, which is the only time window contents can shrink.
+
+    A trade is one market order or one limit-order fill, though a fill writes a BUY
+    and a SELL transaction row; reconcile_stock_stats counts trades the same way.
+    """
+
+    def __init__(self, window: float):
+        super().__init__(window)
+        self._pending: Dict[Tuple[int, datetime], List[float]] = {}
+        self._refreshed_hour: Optional[datetime] = None
+
+    def record(self, stock_id: int, volume: float, amount: float):
+        totals = self._pending.setdefault((stock_id, floor_hour(datetime.utcnow())), [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += volume
+        totals[2] += amount
+
+    async def flush(self) -> int:
+        hour = floor_hour(datetime.utcnow())
+        pending, self._pending = self._pending, {}
+        if not pending and hour == self._refreshed_hour:
+            return 0
+
+        per_stock: Dict[int, List[float]] = {}
+        for (stock_id, _), (trades, volume, notional) in pending.items():
+            totals = per_stock.setdefault(stock_id, [0, 0.0, 0.0])
+            totals[0] += trades
+            totals[1] += volume
+            totals[2] += notional
+
+        try:
+            async with AsyncSessionLocal() as db:
+                if pending:
+                    await add_totals(db, HOURLY, ("stock_id", "bucket_start"), [
+                        {"stock_id": stock_id, "bucket_start": bucket, "trades": trades, "volume": volume,
+                         "notional": notional}
+                        for (stock_id, bucket), (trades, volume, notional) in pending.items()
+                    ])
+                    await add_totals(db, STATS, ("stock_id", "window"), [
+                        {"stock_id": stock_id, "window": window, "trades": trades, "volume": volume,
+                         "notional": notional}
+                        for stock_id, (trades, volume, notional) in per_stock.items() for window in WINDOWS
+                    ])
+                if hour != self._refreshed_hour:
+                    await refresh_windows(db, hour)
+                await db.commit()
+        except Exception:
+            # Merge the deltas back into those recorded meanwhile for the next flush.
+            for key, (trades, volume, notional) in pending.items():
+                totals = self._pending.setdefault(key, [0, 0.0, 0.0])
+                totals[0] += trades
+                totals[1] += volume
+                totals[2] += notional
+            raise
+        self._refreshed_hour = hour
+        return sum(trades for trades, _, _ in pending.values())
+
+
+async def get_stock_stats(db: AsyncSession, stock_id: int) -> List[Dict]:
+    """Totals and VWAP of one stock over every window; one primary-key range read."""
+    rows = {
+        row.window: row._asdict()
+        for row in (await db.execute(
+            select(STATS.c.window, STATS.c.trades, STATS.c.volume, STATS.c.notional)
+            .where(STATS.c.stock_id == stock_id)
+        )).all()
+    }
+    stats = []
+    for window in WINDOWS:
+        row = rows.get(window, {"window": window, "trades": 0, "volume": 0.0, "notional": 0.0})
+        stats.append({**row, "vwap": vwap(row)})
+    return stats
+
+
+async def top_stocks(db: AsyncSession, window: str, by: str, limit: int) -> List[Dict]:
+    """
+    The `limit` stocks with the highest `by` over `window`, read off the
+    (window, <by>) index in descending order: the scan stops after `limit` rows.
+    """
+    ranked = STATS.c[by]
+    rows = (await db.execute(
+        select(Stocks.ticker, STATS.c.trades, STATS.c.volume, STATS.c.notional)
+        .join(Stocks, Stocks.id == STATS.c.stock_id)
+        .where(STATS.c.window == window)
+        .order_by(ranked.desc())
+        .limit(limit)
+    )).all()
+    return [{**row._asdict(), "vwap": vwap(row._asdict())} for row in rows]
+
+
+# Transaction rows that are trades: market orders, and the BUY leg of each limit-order fill.
+TRADE_ROWS = or_(Transaction.order_id.is_(None), Transaction.transaction_type == "BUY")
+
+
+def reconcile_stock_stats(conn, now: Optional[datetime] = None):
+    """
+    Rebuild stock_stats_hourly and stock_stats from the transactions table with
+    set-based INSERT ... SELECT ... GROUP BY, correcting any drift of the incremental
+    totals (e.g. trades buffered by a worker that crashed). Runs on a synchronous
+    connection inside the caller's transaction. Limit-order fills count once, by their
+    BUY row (see TRADE_ROWS).
+
+    Trades still buffered by a running recorder are counted again when it flushes,
+    until the next reconciliation; schedule it away from peak trading.
+    """
+    hour = floor_hour(now or datetime.utcnow())
+    if conn.dialect.name == "postgresql":
+        # keep recorder flushes out while the tables are rebuilt; reads carry on
+        conn.exec_driver_sql("LOCK TABLE stock_stats_hourly, stock_stats IN EXCLUSIVE MODE")
+
+    longest = max(seconds for seconds in WINDOWS.values() if seconds)
+    bucket = truncate_timestamp(conn.dialect.name, Transaction.created_time, "hour")
+    conn.execute(delete(HOURLY))
+    conn.execute(insert(HOURLY).from_select(
+        ["stock_id", "bucket_start", "trades", "volume", "notional"],
+        select(
+            Transaction.ticker_id,
+            bucket,
+            func.count(),
+            func.sum(Transaction.transaction_volume),
+            func.sum(Transaction.transaction_price)
+        ).where(TRADE_ROWS, Transaction.created_time >= window_cutoff(hour, longest))
+        .group_by(Transaction.ticker_id, bucket)
+    ))
+
+    conn.execute(delete(STATS))
+    columns = ["stock_id", "window", "trades", "volume", "notional"]
+    for window, seconds in WINDOWS.items():
+        if seconds is None:
+            source = select(
+                Transaction.ticker_id,
+                literal(window),
+                func.count(),
+                func.sum(Transaction.transaction_volume),
+                func.sum(Transaction.transaction_price)
+            ).where(TRADE_ROWS).group_by(Transaction.ticker_id)
+        else:
+            source = select(
+                HOURLY.c.stock_id,
+                literal(window),
+                func.sum(HOURLY.c.trades),
+                func.sum(HOURLY.c.volume),
+                func.sum(HOURLY.c.notional)
+            ).where(HOURLY.c.bucket_start >= window_cutoff(hour, seconds)).group_by(HOURLY.c.stock_id)
+        conn.execute(insert(STATS).from_select(columns, source))
+
+
+stock_stats = StockStatsRecorder(settings.STOCK_STATS_FLUSH_INTERVAL)
@@ -0,0 +1,106 @@
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import Float, String, bindparam, column, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.background import PeriodicFlusher
+from config.config import settings
+from database.db import AsyncSessionLocal
+from models.stock import Stocks
+from services.price_feed import price_feed
+from services.price_history import price_history
+from services.stock_cache import stock_cache
+
+# Rows per UPDATE ... FROM (VALUES ...) statement, well below Postgres' bind parameter limit.
+VALUES_CHUNK_SIZE = 10000
+
+
+async def write_prices(db: AsyncSession, prices: Dict[str, float]) -> int:
+    """
+    Write the latest price per ticker with one batched UPDATE and commit.
+
+    Postgres gets a single `UPDATE stocks ... FROM (VALUES ...)` per chunk; other
+    databases run one executemany UPDATE. Unknown tickers are ignored. The new
+    prices are also handed to the price history recorder and the price feed.
+    Returns the number of stock rows updated.
+    """
+    if not prices:
+        return 0
+
+    items = list(prices.items())
+    stock_ids = {ticker: stock["id"] for ticker, stock in (await stock_cache.get_many(db, prices)).items()}
+    updated = 0
+    if db.get_bind().dialect.name == "postgresql":
+        for offset in range(0, len(items), VALUES_CHUNK_SIZE):
+            ticks = values(column("ticker", String), column("price", Float), name="ticks") \
+                .data(items[offset:offset + VALUES_CHUNK_SIZE])
+            result = await db.execute(
+                update(Stocks)
+                .where(Stocks.ticker == ticks.c.ticker)
+                .values(stock_price=ticks.c.price)
+            )
+            updated += result.rowcount
+    else:
+        conn = await db.connection()
+        table = Stocks.__table__
+        result = await conn.execute(
+            update(table)
+            .where(table.c.ticker == bindparam("b_ticker"))
+            .values(stock_price=bindparam("b_price")),
+            [{"b_ticker": ticker, "b_price": price} for ticker, price in items]
+        )
+        updated = result.rowcount
+    await db.commit()
+    await stock_cache.invalidate(*prices)
+    stored = {stock_ids[ticker]: price for ticker, price in items if ticker in stock_ids}
+    price_history.record_prices(stored)
+    price_feed.publish_prices(stored)
+    return updated
+
+
+class TickCoalescer(PeriodicFlusher):
+    """
+    Buffers incoming price ticks, keeping only the last price per ticker, and
+    flushes the buffer to the stocks table once per window.
+    """
+
+    def __init__(self, window: float):
+        super().__init__(window)
+        self.received = 0
+        self.rejected = 0
+        self.written = 0
+        self._pending: Dict[str, float] = {}
+
+    def add(self, ticker: str, price: float):
+        self._pending[ticker] = price
+        self.received += 1
+
+    def add_many(self, ticks: Iterable[Tuple[str, float]]):
+        for ticker, price in ticks:
+            self.add(ticker, price)
+
+    def reject(self, count: int = 1):
+        """Count ticks that were dropped before reaching the buffer."""
+        self.rejected += count
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        prices, self._pending = self._pending, {}
+        try:
+            async with AsyncSessionLocal() as db:
+                updated = await write_prices(db, prices)
+        except Exception:
+            # Put the prices back unless a newer tick arrived meanwhile.
+            for ticker, price in prices.items():
+                self._pending.setdefault(ticker, price)
+            raise
+        self.written += updated
+        return updated
+
+    def stats(self) -> Dict[str, int]:
+        return {"received": self.received, "rejected": self.rejected, "written": self.written,
+                "pending": len(self._pending)}
+
+
+tick_coalescer = TickCoalescer(settings.TICK_FLUSH_INTERVAL)
@@ -0,0 +1,137 @@
+import csv
+import io
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select
+
+from models.stock import Stocks
+from models.transaction import Transaction
+from models.users import Users
+
+CSV = "csv"
+PARQUET = "parquet"
+FORMATS = (CSV, PARQUET)
+
+MEDIA_TYPES = {CSV: "text/csv", PARQUET: "application/vnd.apache.parquet"}
+
+# Rows fetched per round trip and encoded together; one Parquet row group each.
+EXPORT_CHUNK_SIZE = 10_000
+
+EXPORT_COLUMNS = ("id", "created_time", "username", "ticker", "transaction_type", "transaction_volume",
+                  "transaction_price")
+
+
+def export_query(start: Optional[datetime] = None, end: Optional[datetime] = None, user_id: Optional[int] = None,
+                 chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Transactions in id order with EXPORT_COLUMNS, optionally within [start, end] and for
+    one user, fetched `chunk_size` rows at a time through a server-side cursor.
+    """
+    query = select(
+        Transaction.id,
+        Transaction.created_time,
+        Users.username,
+        Stocks.ticker,
+        Transaction.transaction_type,
+        Transaction.transaction_volume,
+        Transaction.transaction_price
+    ).join(Users, Users.id == Transaction.user_id) \
+        .join(Stocks, Stocks.id == Transaction.ticker_id) \
+        .order_by(Transaction.id)
+    if start is not None:
+        query = query.where(Transaction.created_time >= start)
+    if end is not None:
+        query = query.where(Transaction.created_time <= end)
+    if user_id is not None:
+        query = query.where(Transaction.user_id == user_id)
+    return query.execution_options(stream_results=True, yield_per=chunk_size)
+
+
+class CsvEncoder:
+    """CSV with a header line; created_time in ISO-8601 like the JSON listings."""
+
+    def header(self) -> bytes:
+        return (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+
+    def encode(self, rows: List[Sequence]) -> bytes:
+        buffer = io.StringIO()
+        ids, created, *rest = zip(*rows)
+        csv.writer(buffer).writerows(zip(ids, map(datetime.isoformat, created), *rest))
+        return buffer.getvalue().encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that keeps what the Parquet writer produced until it is drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+class ParquetEncoder:
+    """
+    Parquet written one row group per chunk: every chunk becomes an Arrow record batch
+    built column by column, and its encoded bytes are handed back as soon as they are
+    written, so only one chunk is ever held. Requires pyarrow.
+    """
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema([
+            ("id", pa.int64()),
+            ("created_time", pa.timestamp("us", tz="UTC")),
+            ("username", pa.string()),
+            ("ticker", pa.string()),
+            ("transaction_type", pa.string()),
+            ("transaction_volume", pa.float64()),
+            ("transaction_price", pa.float64()),
+        ])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression="snappy")
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: List[Sequence]) -> bytes:
+        columns = [self._pa.array(column, type=field.type) for column, field in zip(zip(*rows), self.schema)]
+        self._writer.write_batch(self._pa.record_batch(columns, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+def build_encoder(fmt: str):
+    return ParquetEncoder() if fmt == PARQUET else CsvEncoder()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
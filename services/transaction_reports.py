@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.timeutils import truncate_timestamp
+from models.stock import Stocks
+from models.transaction import Transaction
+from services.order_execution import BUY, SELL
+
+# aggregate mode -> date_trunc field
+BUCKETS = {"hourly": "hour", "daily": "day"}
+
+
+async def aggregate_transactions(db: AsyncSession, user_id: int, start: datetime, end: datetime,
+                                 aggregate: str, stock_id: Optional[int] = None) -> List[Dict]:
+    """
+    Per-bucket, per-ticker trade counts and BUY/SELL volume and notional sums for a
+    user's transactions in [start, end], computed by one GROUP BY over the
+    (user_id, created_time) index. Only the aggregated rows leave the database.
+    """
+    bucket = truncate_timestamp(db.get_bind().dialect.name, Transaction.created_time, BUCKETS[aggregate]) \
+        .label("bucket_start")
+    side = func.upper(Transaction.transaction_type)
+
+    def total(wanted: str, value):
+        return func.coalesce(func.sum(case((side == wanted, value), else_=0.0)), 0.0)
+
+    query = select(
+        bucket,
+        Stocks.ticker,
+        func.count().label("trades"),
+        total(BUY, Transaction.transaction_volume).label("buy_volume"),
+        total(SELL, Transaction.transaction_volume).label("sell_volume"),
+        total(BUY, Transaction.transaction_price).label("buy_notional"),
+        total(SELL, Transaction.transaction_price).label("sell_notional"),
+    ).join(Stocks, Stocks.id == Transaction.ticker_id) \
+        .where(Transaction.user_id == user_id, Transaction.created_time.between(start, end)) \
+        .group_by(bucket, Stocks.ticker) \
+        .order_by(bucket, Stocks.ticker)
+    if stock_id is not None:
+        query = query.where(Transaction.ticker_id == stock_id)
+
+    return [row._asdict() for row in (await db.execute(query)).all()]